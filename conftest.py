@@ -23,6 +23,14 @@ def git_url_substitutions(tmp_home_dir):
         subprocess.check_call(cmd)
 
 
+@pytest.fixture(autouse=True)
+def isolated_cache(monkeypatch, tmp_path):
+    """
+    Keep persistent caches out of the user's cache directory.
+    """
+    monkeypatch.setenv('JARACO_DEVELOP_CACHE', str(tmp_path / 'cache'))
+
+
 @pytest.fixture(autouse=True)
 def published_projects(monkeypatch, tmp_path):
     """
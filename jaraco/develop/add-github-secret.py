@@ -11,7 +11,11 @@ def run(
     name: str,
     value: str,
     project: Annotated[
-        github.Repo, typer.Option(parser=github.Repo)
-    ] = github.Repo.detect(),
+        github.Repo | None,
+        typer.Option(
+            parser=github.Repo, help="Default: the project in this directory."
+        ),
+    ] = None,
 ):
+    project = project or github.Repo.detect()
     project.add_secret(name, value)
@@ -1,12 +1,14 @@
 import getpass
+import itertools
 from typing import Annotated
 
 import jaraco.context
-import keyring
+import more_itertools
+import requests
 import typer
 from jaraco.ui.main import main
 
-from . import github
+from . import filters, git, github
 
 
 @jaraco.context.suppress(Exception)
@@ -29,13 +31,124 @@ secret_sources = {
 }
 
 
+def get_secret(name):
+    import keyring
+
+    return keyring.get_password(**secret_sources[name])
+
+
+def get_secrets(names):
+    """
+    Load the values of the named secrets, failing before anything
+    is pushed if any of them has no keyring entry.
+
+    >>> monkeypatch = getfixture('monkeypatch')
+    >>> monkeypatch.setitem(get_secrets.__globals__, 'get_secret', lambda name: None)
+    >>> get_secrets(['PYPI_TOKEN'])
+    Traceback (most recent call last):
+    ...
+    ValueError: No keyring entry for PYPI_TOKEN.
+    """
+    values = {name: get_secret(name) for name in names}
+    missing = sorted(name for name, value in values.items() if value is None)
+    if missing:
+        raise ValueError(f"No keyring entry for {', '.join(missing)}.")
+    return values
+
+
+def rotate(repos, names=()):
+    """
+    Add the secrets needed by each of the repos (limited to names if
+    given), reading each repo's workflows through the API. Return a
+    mapping of (repo, name) to the response or error, where a repo
+    whose workflows could not be read has the error under the name
+    'workflows'.
+    """
+    repos = list(map(github.Repo, repos))
+    workflows = github.bulk(get_workflows, repos)
+    unread = {
+        (repo, 'workflows'): texts
+        for repo, texts in workflows.items()
+        if isinstance(texts, Exception)
+    }
+    needed = {
+        repo: [
+            name
+            for name in repo.needed_secrets(texts)
+            if name in secret_sources and (not names or name in names)
+        ]
+        for repo, texts in workflows.items()
+        if not isinstance(texts, Exception)
+    }
+    wanted = set(itertools.chain.from_iterable(needed.values()))
+    values = get_secrets(wanted)
+    return {**unread, **github.add_secrets(needed, values)}
+
+
+def get_workflows(repo):
+    """
+    Load the repo's workflows, or the error if they can't be loaded.
+    """
+    try:
+        return repo.get_workflows()
+    except requests.RequestException as exc:
+        return exc
+
+
+def report(results):
+    """
+    Print the secrets added (or failed) for each repo.
+    """
+    by_repo = more_itertools.map_reduce(results.items(), lambda item: item[0][0])
+    for repo in sorted(by_repo):
+        outcomes = (
+            name if not isinstance(result, Exception) else f'{name} (failed: {result})'
+            for (_, name), result in by_repo[repo]
+        )
+        print(f'{repo}: {", ".join(outcomes)}')
+    failed = [result for result in results.values() if isinstance(result, Exception)]
+    print(f'Added {len(results) - len(failed)} secrets to {len(by_repo)} repos.')
+    if failed:
+        raise typer.Exit(1)
+
+
 @main
 def run(
     project: Annotated[
-        github.Repo, typer.Option(parser=github.Repo)
-    ] = github.Repo.detect(),
+        github.Repo | None,
+        typer.Option(
+            parser=github.Repo, help="Default: the project in this directory."
+        ),
+    ] = None,
+    fleet: Annotated[
+        bool, typer.Option(help="Add secrets to all (selected) projects.")
+    ] = False,
+    tag: Annotated[
+        list[filters.Tag], typer.Option('--tag', '-t', parser=filters.Tag)
+    ] = [],
+    keyword: Annotated[
+        list[filters.Keyword],
+        typer.Option('--keyword', '-k', parser=filters.Keyword),
+    ] = [],
+    secret: Annotated[
+        list[str], typer.Option('--secret', '-s', help="Only add these secrets.")
+    ] = [],
 ):
-    for name in project.find_needed_secrets():
-        source = secret_sources[name]
-        value = keyring.get_password(**source)
+    if fleet:
+        projects = filters.Selectors(tag + keyword).select(git.projects())
+        urls = git.resolve_many(projects).values()
+        try:
+            results = rotate((url.path.strip('/') for url in urls), secret)
+        except ValueError as exc:
+            print(exc)
+            raise typer.Exit(1)
+        report(results)
+        return
+    project = project or github.Repo.detect()
+    try:
+        values = get_secrets(project.find_needed_secrets())
+    except ValueError as exc:
+        print(exc)
+        raise typer.Exit(1)
+    for name, value in values.items():
         project.add_secret(name, value)
@@ -0,0 +1,79 @@
+"""
+Measure the time to import each of the modules, and so to start
+each of the commands, in a fresh interpreter.
+
+Modules that are only needed for some operations (like keyring,
+nacl and the project metadata builder) are imported when needed,
+so that the commands and the library start quickly.
+
+>>> heavy = {'keyring', 'nacl', 'jaraco.packaging.metadata', 'build'}
+>>> heavy & imported('jaraco.develop.git')
+set()
+>>> 'requests' in imported('jaraco.develop.git')
+False
+>>> heavy & imported('jaraco.develop.add-github-secrets')
+set()
+"""
+
+import importlib.resources
+import subprocess
+import sys
+import time
+from typing import Annotated
+
+import typer
+from jaraco.ui.main import main
+
+
+def modules():
+    """
+    Generate the names of the modules in the package.
+    """
+    files = importlib.resources.files('jaraco.develop').iterdir()
+    names = sorted(file.name for file in files if file.name.endswith('.py'))
+    return (f'jaraco.develop.{name[:-3]}' for name in names if name != '__init__.py')
+
+
+def _timed(code):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def import_time(module, runs=3):
+    """
+    Return the best time in seconds to start an interpreter and
+    import the module, less the time to start the interpreter.
+    """
+    code = f'import importlib; importlib.import_module({module!r})'
+    baseline = min(_timed('pass') for _ in range(runs))
+    return min(_timed(code) for _ in range(runs)) - baseline
+
+
+def imported(module):
+    """
+    Return the names of the modules loaded by importing the module.
+    """
+    code = (
+        f'import importlib, sys; importlib.import_module({module!r}); '
+        'print(*sys.modules)'
+    )
+    cmd = [sys.executable, '-c', code]
+    return set(subprocess.check_output(cmd, encoding='utf-8').split())
+
+
+@main
+def run(
+    runs: Annotated[int, typer.Option(min=1, help="Best of this many runs.")] = 3,
+    limit: Annotated[
+        float | None,
+        typer.Option(help="Fail if any import takes longer (in seconds)."),
+    ] = None,
+):
+    times = {module: import_time(module, runs) for module in modules()}
+    for module, elapsed in sorted(times.items(), key=lambda item: -item[1]):
+        print(f'{elapsed * 1000:8.1f} ms  {module}')
+    slow = [module for module, elapsed in times.items() if limit and elapsed > limit]
+    if slow:
+        print(f"Slower than {limit}s: {', '.join(slow)}")
+        raise typer.Exit(1)
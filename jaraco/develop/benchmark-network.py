@@ -0,0 +1,132 @@
+"""
+Benchmark fleet-wide network operations against the local stand-in
+service (:mod:`jaraco.develop.fake`), reporting requests per second,
+median and 99th percentile latency and total wall time for each
+operation at each fleet size.
+"""
+
+import concurrent.futures
+import contextlib
+import os
+import statistics
+import tempfile
+import time
+import types
+import unittest.mock
+from typing import Annotated
+
+import typer
+from jaraco.ui.main import main
+
+from . import fake, git, github, rtd
+
+
+class Recorder(list):
+    """
+    Record the latency of each response in a session.
+    """
+
+    def __call__(self, resp, *args, **kwargs):
+        self.append(resp.elapsed.total_seconds())
+
+    @contextlib.contextmanager
+    def attached(self, *sessions):
+        for session in sessions:
+            session.hooks['response'].append(self)
+        try:
+            yield self
+        finally:
+            for session in sessions:
+                session.hooks['response'].remove(self)
+
+
+def enable_pr_builds(repos):
+    with concurrent.futures.ThreadPoolExecutor(github.Repo.concurrency) as pool:
+        list(pool.map(rtd.enable_pr_build, (repo.partition('/')[2] for repo in repos)))
+
+
+operations = dict(
+    workflows=lambda repos: github.bulk(github.Repo.get_workflows, repos),
+    secrets=lambda repos: github.add_secrets(
+        {repo: ['PYPI_TOKEN'] for repo in repos}, dict(PYPI_TOKEN='secret')
+    ),
+    releases=lambda repos: github.bulk(
+        lambda repo: repo.create_release('v1.0.0'), repos
+    ),
+    rtd=enable_pr_builds,
+)
+"""
+Fleet-wide operations to measure, each taking the repos.
+"""
+
+
+def measure(operation, repos):
+    """
+    Run the operation, returning its statistics.
+    """
+    sessions = github.Repo.get_session(), rtd.session()
+    with Recorder().attached(*sessions) as latencies:
+        start = time.perf_counter()
+        operation(repos)
+        wall = time.perf_counter() - start
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0] * 99
+    return types.SimpleNamespace(
+        requests=len(latencies),
+        rate=len(latencies) / wall,
+        p50=cuts[49],
+        p99=cuts[98],
+        wall=wall,
+    )
+
+
+@contextlib.contextmanager
+def serving(**kwargs):
+    """
+    Run the service and direct the sessions to it, keeping
+    any persistent caches out of the way.
+    """
+    with fake.Service(**kwargs) as service, tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            service.environ,
+            GITHUB_TOKEN='fake',
+            READTHEDOCS_TOKEN='fake',
+            JARACO_DEVELOP_CACHE=tmp,
+        )
+        with (
+            unittest.mock.patch.dict(os.environ, env),
+            unittest.mock.patch.object(rtd, 'url', env['READTHEDOCS_URL']),
+        ):
+            github.Repo.get_session.cache_clear()
+            github.Repo.get_public_key.cache_clear()
+            rtd.session.cache_clear()
+            try:
+                yield service
+            finally:
+                github.Repo.get_session.cache_clear()
+                rtd.session.cache_clear()
+
+
+@main
+def run(
+    projects: Annotated[
+        list[int], typer.Option('--projects', '-p', help="Fleet sizes to measure.")
+    ] = [10, 100, 1000],
+    latency: Annotated[float, typer.Option(help="Seconds per request.")] = 0.005,
+    rate_limit: Annotated[
+        int | None, typer.Option(help="Requests allowed per second.")
+    ] = None,
+):
+    header = f'{"operation":<10} {"projects":>8} {"requests":>8} '
+    header += f'{"req/s":>8} {"p50 ms":>8} {"p99 ms":>8} {"wall s":>8}'
+    print(header)
+    for size in projects:
+        with serving(projects=size, latency=latency, rate_limit=rate_limit):
+            repos = list(map(github.Repo, git.projects()))
+            for name, operation in operations.items():
+                stats = measure(operation, repos)
+                print(
+                    f'{name:<10} {size:>8} {stats.requests:>8} {stats.rate:>8.1f} '
+                    f'{stats.p50 * 1000:>8.1f} {stats.p99 * 1000:>8.1f} '
+                    f'{stats.wall:>8.2f}',
+                    flush=True,
+                )
@@ -0,0 +1,47 @@
+"""
+Persistent on-disk caches shared by the development routines.
+"""
+
+import os
+import tempfile
+
+import path
+import platformdirs
+
+
+def location(*parts):
+    """
+    Return a directory in the cache, creating it if needed.
+
+    Set JARACO_DEVELOP_CACHE to relocate the cache.
+
+    >>> location('sample').is_dir()
+    True
+    """
+    root = os.environ.get('JARACO_DEVELOP_CACHE') or platformdirs.user_cache_dir(
+        'jaraco.develop'
+    )
+    dir = path.Path(root).joinpath(*parts)
+    dir.makedirs_p()
+    return dir
+
+
+def write_text(file, text):
+    """
+    Write the text to the file through a temporary file, so that
+    concurrent readers see either the old content or the new,
+    never a partial write.
+
+    >>> file = location('sample') / 'greeting.txt'
+    >>> write_text(file, 'hello')
+    >>> file.read_text(encoding='utf-8')
+    'hello'
+    """
+    fd, tmp = tempfile.mkstemp(dir=file.parent, prefix=f'.{file.name}.')
+    try:
+        with open(fd, 'w', encoding='utf-8') as stream:
+            stream.write(text)
+        os.replace(tmp, file)
+    except BaseException:
+        os.remove(tmp)
+        raise
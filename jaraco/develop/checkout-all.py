@@ -1,15 +1,96 @@
-import functools
+"""
+Check out all projects not already present under a root.
+
+Clones run concurrently, limited overall and per host. Completed
+projects are recorded in a journal so that an interrupted run resumes
+without re-checking every target directory.
+"""
+
+import concurrent.futures
+import hashlib
+import subprocess
+import threading
 from typing import Annotated
 
 import path
 import typer
 from jaraco.ui.main import main
-from more_itertools import consume
 
-from . import git
+from . import cache, git
+
+
+class Journal:
+    """
+    Record of the projects already checked out under a root.
+
+    >>> root = path.Path(getfixture('tmp_path'))
+    >>> Journal(root).record('keyring')
+    >>> journal = Journal(root)
+    >>> journal.done
+    {'keyring'}
+    >>> journal.clear()
+    >>> Journal(root).done
+    set()
+    """
+
+    def __init__(self, root):
+        key = hashlib.sha256(str(root.absolute()).encode('utf-8')).hexdigest()[:12]
+        self.path = cache.location('checkout-all') / f'{key}.txt'
+        lines = (
+            self.path.lines(encoding='utf-8', retain=False)
+            if self.path.exists()
+            else []
+        )
+        self.done = set(lines)
+
+    def record(self, project):
+        with self.path.open('a', encoding='utf-8') as file:
+            file.write(f'{project}\n')
+
+    def clear(self):
+        self.path.remove_p()
+
+
+def checkout(project, root, limit):
+    with limit:
+        git.checkout_missing(project, root, quiet=True)
 
 
 @main
-def run(target: Annotated[path.Path, typer.Argument(parser=path.Path)] = path.Path()):
-    checkout = functools.partial(git.checkout_missing, root=target)
-    consume(map(checkout, git.projects()))
+def run(
+    target: Annotated[path.Path, typer.Argument(parser=path.Path)] = path.Path(),
+    jobs: Annotated[
+        int, typer.Option('--jobs', '-j', min=1, help="Maximum concurrent clones.")
+    ] = 8,
+    per_host: Annotated[
+        int, typer.Option(min=1, help="Maximum concurrent clones from one host.")
+    ] = 4,
+):
+    journal = Journal(target)
+    pending = sorted(set(git.projects()) - journal.done)
+    urls = git.resolve_many(pending)
+    limits = {
+        host: threading.BoundedSemaphore(per_host)
+        for host in {url.host for url in urls.values()}
+    }
+    failed = []
+    with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+        futures = {
+            pool.submit(checkout, project, target, limits[urls[project].host]): project
+            for project in pending
+        }
+        done = concurrent.futures.as_completed(futures)
+        for count, future in enumerate(done, start=1):
+            project = futures[future]
+            try:
+                future.result()
+            except subprocess.CalledProcessError as exc:
+                failed.append(project)
+                print(f'[{count}/{len(pending)}] {project} failed: {exc}', flush=True)
+                continue
+            journal.record(project)
+            print(f'[{count}/{len(pending)}] {project}', flush=True)
+    if failed:
+        print(f"Failed to check out {', '.join(failed)}.")
+        raise typer.Exit(1)
+    journal.clear()
@@ -1,11 +1,17 @@
+import concurrent.futures
 import contextlib
-import mimetypes
+import hashlib
+import json
+import os
 import shutil
+import sys
 import tempfile
+import types
 
-from jaraco.ui.editor import EditableFile
 from setuptools._distutils import ccompiler, sysconfig
 
+from . import cache
+
 
 @contextlib.contextmanager
 def temp_dir():
@@ -35,24 +41,108 @@ class FalseString(str):
         return False
 
 
-def can_compile_extension():
+capabilities = dict(
+    headers=types.SimpleNamespace(
+        source='#include <Python.h>\n', suffix='.c', link=False
+    ),
+    link=types.SimpleNamespace(
+        source='int main(void) { return 0; }\n', suffix='.c', link=True
+    ),
+    cplusplus=types.SimpleNamespace(
+        source='#include <vector>\nstd::vector<int> values;\n',
+        suffix='.cpp',
+        link=False,
+    ),
+)
+"""
+Capabilities that may be probed, each a source to compile (and
+optionally link).
+"""
+
+
+def new_compiler():
+    """
+    Put together a compiler much like distutils might.
+    """
+    compiler = ccompiler.new_compiler()
+    sysconfig.customize_compiler(compiler)
+    return compiler
+
+
+def _fingerprint(compiler):
+    """
+    Identify the interpreter and compiler toolchain, such that any
+    change to either invalidates previously-probed results.
+    """
+    executable = getattr(compiler, 'compiler_so', None) or [compiler.compiler_type]
+    found = shutil.which(executable[0])
+    stat = os.stat(found) if found else None
+    parts = [
+        sys.executable,
+        get_include_dirs(),
+        executable,
+        found,
+        stat and [stat.st_mtime, stat.st_size],
+    ]
+    return hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def _check(compiler, dir, name):
+    capability = capabilities[name]
+    source = os.path.join(dir, name + capability.suffix)
+    with open(source, 'w', encoding='utf-8') as file:
+        file.write(capability.source)
+    try:
+        objects = compiler.compile(
+            [source], output_dir=dir, include_dirs=get_include_dirs()
+        )
+        if capability.link:
+            compiler.link_executable(objects, name, output_dir=dir)
+    except Exception as e:
+        return str(e) or type(e).__name__
+    return True
+
+
+def probe(*names):
     """
-    Put together a compiler much like distutils might and see if it can
-    compile the simplest of extensions. Return True if it succeeds, else
-    return a string of the error reason (which also resolves to boolean
+    Check the named capabilities (all by default) with one compiler,
+    concurrently. Return a mapping of each name to True, or to a
+    string of the error reason (which also resolves to boolean
     False for simple testing).
+
+    Successes are cached for the interpreter and compiler. Failures
+    are not, as they may be remedied (such as by installing headers)
+    without changing either.
+
+    >>> results = probe('headers', 'link')
+    >>> sorted(results)
+    ['headers', 'link']
+    >>> probe('headers') == {'headers': results['headers']}
+    True
+    """
+    names = names or tuple(capabilities)
+    compiler = new_compiler()
+    file = cache.location('compiler') / f'{_fingerprint(compiler)}.json'
+    cached = json.loads(file.read_text(encoding='utf-8')) if file.exists() else {}
+    known = {name: result for name, result in cached.items() if result is True}
+    missing = [name for name in names if name not in known]
+    if missing:
+        with temp_dir() as dir, concurrent.futures.ThreadPoolExecutor() as pool:
+            checks = pool.map(lambda name: _check(compiler, dir, name), missing)
+            known.update(zip(missing, checks))
+        passed = {name: result for name, result in known.items() if result is True}
+        if passed.keys() != cached.keys():
+            cache.write_text(file, json.dumps(passed))
+    return {
+        name: True if known[name] is True else FalseString(known[name])
+        for name in names
+    }
+
+
+def can_compile_extension():
+    """
+    See if the compiler can compile the simplest of extensions.
+    Return True if it succeeds, else return a string of the error
+    reason (which also resolves to boolean False for simple testing).
     """
-    test_compiler_c = "#include <python.h>\n"
-    # make sure mimetypes knows the extension for c files
-    mimetypes.add_type('text/x-c', '.c')
-    with EditableFile(test_compiler_c, 'text/x-c') as file:
-        with temp_dir() as output_dir:
-            try:
-                compiler = ccompiler.new_compiler()
-                compiler.compile(
-                    [file.name], output_dir=output_dir, include_dirs=get_include_dirs()
-                )
-                result = True
-            except Exception as e:
-                result = FalseString(e)
-    return result
+    return probe('headers')['headers']
@@ -2,19 +2,33 @@
 Sync files from an upstream CPython release.
 """
 
+import concurrent.futures
+import hashlib
 import json
+import os
 import pathlib
 import re
 import subprocess
+import tempfile
 
 import packaging.version
 from jaraco.ui.main import main
 from requests_toolbelt import sessions
 
-gh_content = sessions.BaseUrlSession(
-    'https://raw.githubusercontent.com/python/cpython/'
-)
-gh_api = sessions.BaseUrlSession('https://api.github.com/repos/python/cpython/')
+from . import cache, github
+
+concurrency = 10
+"""
+Maximum number of concurrent downloads.
+"""
+
+raw_url = os.environ.get('GITHUB_RAW_URL', 'https://raw.githubusercontent.com')
+api_url = os.environ.get('GITHUB_API_URL', 'https://api.github.com')
+
+gh_content = sessions.BaseUrlSession(f'{raw_url}/python/cpython/')
+gh_api = sessions.BaseUrlSession(f'{api_url}/repos/python/cpython/')
+for _session in (gh_content, gh_api):
+    _session.mount(_session.base_url, github.RateLimitAdapter(concurrency))
 
 
 def load_file_map():
@@ -44,17 +58,124 @@ def is_stable(tag):
     return not by_tag(tag).is_stable
 
 
+def get_tags():
+    """
+    Load all of the tags, following the pages.
+    """
+    url = 'tags?per_page=100'
+    while url:
+        resp = gh_api.get(url)
+        resp.raise_for_status()
+        yield from resp.json()
+        url = resp.links.get('next', {}).get('url')
+
+
+def digest(path):
+    """
+    Return the SHA-256 of the file, or None if it doesn't exist.
+    """
+    hash = hashlib.sha256()
+    try:
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(2**16), b''):
+                hash.update(chunk)
+    except FileNotFoundError:
+        return None
+    return hash.hexdigest()
+
+
+def sync(src, dst, entry, session=gh_content):
+    """
+    Sync the file at src to dst, streaming it through a temporary
+    file and only replacing dst if the content differs. Return the
+    new manifest entry.
+
+    Skip the download if dst holds the recorded content of src. If
+    dst holds the recorded content of another source, request it
+    conditionally (raw content ETags are derived from the content).
+
+    >>> from jaraco.develop import fake
+    >>> dst = getfixture('tmp_path') / 'abc.py'
+    >>> with fake.Service() as service:
+    ...     session = sessions.BaseUrlSession(f'{service.url}/raw/python/cpython/')
+    ...     entry = sync('v3.12.0/Lib/abc.py', dst, {}, session)
+    ...     again = sync('v3.12.0/Lib/abc.py', dst, entry, session)
+    ...     moved = sync('v3.12.1/Lib/abc.py', dst, entry, session)
+    >>> dst.read_text(encoding='utf-8').splitlines()[0]
+    '# Lib/abc.py'
+    >>> again is entry
+    True
+    >>> moved['src'], moved['sha256'] == entry['sha256']
+    ('v3.12.1/Lib/abc.py', True)
+
+    Only the first sync downloaded the content; the last was a
+    conditional request answered with "not modified".
+
+    >>> service.requests
+    2
+    """
+    current = digest(dst)
+    intact = current is not None and entry.get('sha256') == current
+    if intact and entry.get('src') == src:
+        return entry
+    headers = {'If-None-Match': entry['etag']} if intact and entry['etag'] else {}
+    with session.get(src, headers=headers, stream=True) as resp:
+        resp.raise_for_status()
+        if resp.status_code == 304:
+            return dict(entry, src=src)
+        hash = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dst) or '.')
+        try:
+            with open(fd, 'wb') as out:
+                for chunk in resp.iter_content(2**16):
+                    hash.update(chunk)
+                    out.write(chunk)
+            if hash.hexdigest() != current:
+                os.chmod(tmp, os.stat(dst).st_mode if current else 0o644)
+                os.replace(tmp, dst)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return dict(src=src, etag=resp.headers.get('ETag'), sha256=hash.hexdigest())
+
+
+def manifest_path():
+    """
+    Locate the record of the source, ETag and content hash of each
+    file synced into the repo in the current directory, kept in the
+    cache rather than the repo.
+    """
+    repo = os.path.abspath('.').encode('utf-8')
+    key = hashlib.sha256(repo).hexdigest()[:12]
+    return cache.location('cpython-sync') / f'{key}.json'
+
+
+def load_manifest():
+    path = manifest_path()
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def save_manifest(manifest):
+    cache.write_text(manifest_path(), json.dumps(manifest, indent=2))
+
+
 @main
 def run(pre: bool = False):
-    tags = gh_api.get('tags').json()
+    tags = list(get_tags())
     filtered = tags if pre else filter(is_stable, tags)
     tag = max(filtered, key=by_tag)
     version = tag['name']
-    for src, dst in load_file_map().items():
-        resp = gh_content.get(f'{version}/{src}')
-        resp.raise_for_status()
-        with open(dst, 'wb') as out:
-            out.write(resp.content)
+    manifest = load_manifest()
+
+    def sync_entry(item):
+        src, dst = item
+        return dst, sync(f'{version}/{src}', dst, manifest.get(dst, {}))
+
+    with concurrent.futures.ThreadPoolExecutor(concurrency) as pool:
+        manifest.update(pool.map(sync_entry, load_file_map().items()))
+    save_manifest(manifest)
     cmd = [
         'git',
         'commit',
@@ -9,8 +9,12 @@ from . import github, repo
 @main
 def run(
     project: Annotated[
-        github.Repo, typer.Option(parser=github.Repo)
-    ] = github.Repo.detect(),
+        github.Repo | None,
+        typer.Option(
+            parser=github.Repo, help="Default: the project in this directory."
+        ),
+    ] = None,
 ):
     md = repo.get_project_metadata()
+    project = project or github.Repo(md.project)
     project.create_release(tag=f'v{md.version}')
@@ -0,0 +1,212 @@
+"""
+A local stand-in for the services the routines talk to: the GitHub
+API (repos, secrets, releases, contents and tags), raw GitHub
+content, Read the Docs (v3) and a projects list, with configurable
+latency and rate limits, for measurement and offline testing.
+
+Point the routines at it with the environment variables in
+:attr:`Service.environ`.
+
+>>> import requests
+>>> with Service(projects=3) as service:
+...     resp = requests.get(f'{service.url}/projects.txt')
+>>> resp.text.split()
+['fleet/project-0', 'fleet/project-1', 'fleet/project-2']
+>>> service.requests
+1
+"""
+
+import base64
+import hashlib
+import http.server
+import json
+import os
+import re
+import threading
+import time
+import urllib.parse
+
+workflow = """\
+on: push
+jobs:
+  release:
+    env:
+      TWINE_PASSWORD: ${{ secrets.PYPI_TOKEN }}
+"""
+
+
+class Service(http.server.ThreadingHTTPServer):
+    """
+    Serve the fake endpoints on an ephemeral local port.
+
+    latency is the seconds each request takes. rate_limit, if given,
+    is the number of requests allowed per window (in seconds), beyond
+    which requests are refused with a 429 and a Retry-After.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, projects=10, latency=0.0, rate_limit=None, window=1.0, tags=250):
+        super().__init__(('127.0.0.1', 0), Handler)
+        self.projects = [f'fleet/project-{n}' for n in range(projects)]
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.window = window
+        self.tags = tags
+        self.key = base64.b64encode(os.urandom(32)).decode('ascii')
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def environ(self):
+        """
+        Environment variables directing the routines to this service.
+        """
+        return dict(
+            GITHUB_API_URL=self.url,
+            GITHUB_RAW_URL=f'{self.url}/raw',
+            READTHEDOCS_URL=f'{self.url}/rtd/',
+            PROJECTS_LIST_URL=f'{self.url}/projects.txt',
+        )
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+    def throttle(self):
+        """
+        Count a request. Return the seconds until the rate limit
+        resets if it's exceeded, else None.
+        """
+        with self._lock:
+            self.requests += 1
+            now = time.monotonic()
+            if now - self._window_start >= self.window:
+                self._window_start, self._window_count = now, 0
+            self._window_count += 1
+            if self.rate_limit is None or self._window_count <= self.rate_limit:
+                return None
+            return self.window - (now - self._window_start)
+
+
+def _etag(content):
+    return '"' + hashlib.sha256(content).hexdigest()[:32] + '"'
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    server: Service
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    repo = r'/repos/(?P<repo>[^/]+/[^/]+)'
+    routes = [
+        ('GET', r'/projects\.txt', 'projects_list'),
+        ('GET', repo + r'/actions/secrets/public-key', 'public_key'),
+        ('PUT', repo + r'/actions/secrets/\w+', 'created'),
+        ('POST', repo + r'/releases', 'release'),
+        ('GET', repo + r'/contents/\.github/workflows', 'workflows'),
+        ('GET', repo + r'/contents/(?P<path>.+)', 'content'),
+        ('GET', repo + r'/tags', 'tags'),
+        ('GET', r'/raw/[^/]+/[^/]+/(?P<version>[^/]+)/(?P<path>.+)', 'raw'),
+        ('PATCH', r'/rtd/api/v3/projects/[^/]+/', 'updated'),
+    ]
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle_method(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.server.latency)
+        delay = self.server.throttle()
+        if delay is not None:
+            return self.respond(
+                429, b'{"message": "rate limited"}', {'Retry-After': f'{delay:.3f}'}
+            )
+        url = urllib.parse.urlsplit(self.path)
+        self.query = dict(urllib.parse.parse_qsl(url.query))
+        for method, pattern, name in self.routes:
+            match = re.fullmatch(pattern, url.path)
+            if method == self.command and match:
+                return getattr(self, name)(**match.groupdict())
+        self.respond(404, b'{"message": "Not Found"}')
+
+    do_GET = do_PUT = do_POST = do_PATCH = handle_method
+
+    def respond(self, status, body=b'', headers={}, type='application/json'):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def respond_cached(self, content, type):
+        """
+        Respond with the content, or 304 if the client has it.
+        """
+        etag = _etag(content)
+        if self.headers.get('If-None-Match') == etag:
+            return self.respond(304, headers={'ETag': etag})
+        self.respond(200, content, {'ETag': etag}, type=type)
+
+    def projects_list(self):
+        content = '\n'.join(self.server.projects).encode('utf-8')
+        self.respond_cached(content, 'text/plain')
+
+    def public_key(self, repo):
+        self.respond(200, dict(key=self.server.key, key_id='1'))
+
+    def created(self, repo):
+        self.respond(201)
+
+    def updated(self):
+        self.respond(204)
+
+    def release(self, repo):
+        self.respond(201, dict(id=1, html_url=f'{self.server.url}/{repo}/releases/1'))
+
+    def workflows(self, repo):
+        files = [dict(path='.github/workflows/main.yml', type='file')]
+        self.respond(200, files)
+
+    def content(self, repo, path):
+        self.respond(200, workflow.encode('utf-8'), type='text/plain')
+
+    def tags(self, repo):
+        page = int(self.query.get('page', 1))
+        per_page = int(self.query.get('per_page', 30))
+        numbers = range(self.server.tags)[(page - 1) * per_page : page * per_page]
+        tags = [
+            dict(
+                name=f'v3.{number // 10}.{number % 10}',
+                commit=dict(sha=hashlib.sha1(str(number).encode()).hexdigest()),
+            )
+            for number in numbers
+        ]
+        headers = {}
+        if page * per_page < self.server.tags:
+            next = f'{self.server.url}/repos/{repo}/tags'
+            next += f'?per_page={per_page}&page={page + 1}'
+            headers['Link'] = f'<{next}>; rel="next"'
+        self.respond(200, tags, headers)
+
+    def raw(self, version, path):
+        """
+        Serve content that depends only on the path, so it's the
+        same for every version.
+        """
+        self.respond_cached(f'# {path}\n'.encode('utf-8') * 100, 'text/plain')
@@ -14,9 +14,18 @@ Create keyword and tag selectors for projects.
 >>> sel = Selectors(itertools.chain(keywords, tags))
 >>> list(filter(sel, projects))
 ['/python/cpython']
+
+Select from many projects at once.
+
+>>> sel.select(projects)
+['/python/cpython']
+>>> sorted(Selectors([Tag('not lifted')]).select(projects))
+['/pmxbot/pmxbot.nsfw', '/python/cpython', 'jaraco.develop', 'keyrings.firefox']
 """
 
+import functools
 import operator
+import re
 
 import more_itertools
 
@@ -35,22 +44,83 @@ class Selectable:
     def invert(self, value: bool):
         return value if self.mode == 'selecting' else not value
 
+    @classmethod
+    def matcher(cls, indicators):
+        """
+        Return a function that determines if a project matches
+        any of the indicators.
+        """
+        selectors = [cls(indicator) for indicator in indicators]
+        return lambda project: any(selector(project) for selector in selectors)
+
 
 class Selectors(list):
     def __call__(self, other):
-        buckets = more_itertools.bucket(self, operator.attrgetter('mode'))
-        selecting = list(buckets['selecting'])
-        excluding = list(buckets['excluding'])
+        return self.compiled(other)
+
+    @functools.cached_property
+    def compiled(self):
+        """
+        The predicate for these selectors, compiled on first use
+        (so the selectors should not be changed after).
+        """
+        key = tuple((type(selector), selector) for selector in self)
+        return _compile(key)
+
+    def select(self, projects):
+        """
+        Return the projects matching these selectors.
+        """
+        return list(filter(self.compiled, projects))
+
+
+@functools.lru_cache
+def _compile(key):
+    """
+    Compile the selectors into a single predicate, with one matcher
+    for each kind of selector in each mode.
+    """
+    selectors = map(operator.itemgetter(1), key)
+    by_mode = more_itertools.bucket(selectors, operator.attrgetter('mode'))
+
+    def matchers(mode):
+        by_type = more_itertools.map_reduce(
+            by_mode[mode], type, operator.attrgetter('indicator')
+        )
+        return [type_.matcher(indicators) for type_, indicators in by_type.items()]
+
+    selecting = matchers('selecting')
+    excluding = matchers('excluding')
+
+    def predicate(project):
         return (
-            not selecting or any(selector(other) for selector in selecting)
-        ) and all(selector(other) for selector in excluding)
+            not selecting or any(match(project) for match in selecting)
+        ) and not any(match(project) for match in excluding)
+
+    return predicate
 
 
 class Keyword(str, Selectable):
     def __call__(self, other):
         return self.invert(other.__contains__(self.indicator))
 
+    @classmethod
+    def matcher(cls, indicators):
+        """
+        >>> match = Keyword.matcher(['foo', 'a.b'])
+        >>> bool(match('xa.by'))
+        True
+        >>> bool(match('xaby'))
+        False
+        """
+        return re.compile('|'.join(map(re.escape, indicators))).search
+
 
 class Tag(str, Selectable):
     def __call__(self, other):
         return self.invert(self.indicator in other.tags)
+
+    @classmethod
+    def matcher(cls, indicators):
+        tags = frozenset(indicators)
+        return lambda project: not tags.isdisjoint(project.tags)
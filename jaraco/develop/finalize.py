@@ -6,11 +6,20 @@ from jaraco.ui.main import main
 from . import towncrier
 
 
+def finalize_version(version, root=None):
+    """
+    Build the changelog for version, commit it, and tag the release,
+    in the project at root (default the current directory).
+    """
+    ver = towncrier.semver(version)
+    # workaround for twisted/towncrier#538
+    pathlib.Path(root or '.', 'newsfragments').mkdir(exist_ok=True)
+    towncrier.run('build', '--yes', version=version, root=root)
+    subprocess.check_call(['git', 'commit', '-a', '-mFinalize'], cwd=root)
+    subprocess.check_call(['git', 'tag', '-a', '-m', '', ver], cwd=root)
+    return ver
+
+
 @main
 def finalize():
-    ver = towncrier.semver(towncrier.get_version())
-    # workaround for twisted/towncrier#538
-    pathlib.Path('newsfragments').mkdir(exist_ok=True)
-    towncrier.run('build', '--yes')
-    subprocess.check_call(['git', 'commit', '-a', '-mFinalize'])
-    subprocess.check_call(['git', 'tag', '-a', '-m', '', ver])
+    finalize_version(towncrier.get_version())
@@ -1,21 +1,30 @@
 from __future__ import annotations
 
+import collections
+import concurrent.futures
 import contextlib
 import functools
+import hashlib
+import json
 import os
 import pathlib
 import posixpath
 import re
 import subprocess
-import types
+import sys
+import threading
+import time
 import urllib.parse
 
 import path
-import requests
-import requests_file
 from more_itertools import flatten
 
-from . import github
+from . import cache
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
 from .compat.py38 import removeprefix, removesuffix
 
 
@@ -39,6 +48,11 @@ class URLScheme:
     >>> scheme = URLScheme.lookup('https://github.com/foo/bar')
     >>> scheme
     URLScheme('gh://', 'https://github.com/')
+
+    As with git, the longest matching prefix wins.
+
+    >>> URLScheme.lookup('https://gist.github.com/foo')
+    URLScheme('gist://', 'https://gist.github.com/')
     """
 
     def __init__(self, prefix, value):
@@ -58,10 +72,14 @@ class URLScheme:
         return cls(scheme, url)
 
     def resolve(self, url):
-        return url.replace(self.prefix, self.value)
+        if not url.startswith(self.prefix):
+            return url
+        return self.value + url[len(self.prefix) :]
 
     def apply(self, url):
-        return url.replace(self.value, self.prefix)
+        if not url.startswith(self.value):
+            return url
+        return self.prefix + url[len(self.value) :]
 
     @classmethod
     @functools.lru_cache
@@ -72,10 +90,26 @@ class URLScheme:
         ).stdout
         return set(map(cls.parse, lines.splitlines()))
 
+    @classmethod
+    @functools.lru_cache
+    def index(cls):
+        """
+        Index the schemes by prefix and by value, along with a single
+        pattern matching the longest of those at the start of a URL.
+        """
+        by_key = {}
+        for scheme in cls.load():
+            by_key.setdefault(scheme.prefix, scheme)
+            by_key.setdefault(scheme.value, scheme)
+        keys = sorted(by_key, key=len, reverse=True)
+        pattern = re.compile('|'.join(map(re.escape, keys)) or '(?!)')
+        return pattern, by_key
+
     @classmethod
     def lookup(cls, url):
-        checks = (scheme for scheme in cls.load() if scheme.matches(url))
-        return next(checks, NullScheme())
+        pattern, by_key = cls.index()
+        match = pattern.match(url)
+        return by_key[match.group(0)] if match else NullScheme()
 
 
 class NullScheme:
@@ -109,6 +143,14 @@ class URL(str):
     def path(self):
         return urllib.parse.urlparse(self.resolved).path
 
+    @property
+    def host(self):
+        """
+        >>> URL('gh://jaraco/keyring').host
+        'github.com'
+        """
+        return urllib.parse.urlparse(self.resolved).netloc
+
 
 class Project(str):
     """
@@ -116,31 +158,60 @@ class Project(str):
     >>> p
     'foo-project'
     >>> p.tags
-    ['tag1', 'tag2']
+    ('tag1', 'tag2')
     >>> p.spec
     'foo-project [tag1] [tag2]'
+
+    Parsed projects are interned.
+
+    >>> Project.parse('foo-project [tag1] [tag2]') is p
+    True
     """
 
-    pattern = re.compile(r'(?P<name>\S+)\s*(?P<rest>.*)$')
-    tags: list[str] = []
+    __slots__ = ('tags',)
+    tags: tuple[str, ...]
 
-    def __new__(self, value, **kwargs):
-        return super().__new__(self, value)
+    tag_pattern = re.compile(r'\[(.*?)\]')
 
-    def __init__(self, value, **kwargs):
-        vars(self).update(kwargs)
+    def __new__(cls, value, tags=()):
+        self = super().__new__(cls, value)
+        self.tags = tuple(map(sys.intern, tags))
+        return self
 
     @classmethod
+    @functools.lru_cache(maxsize=None)
     def parse(cls, line):
-        match = types.SimpleNamespace(**cls.pattern.match(line).groupdict())
-        tags = list(re.findall(r'\[(.*?)\]', match.rest))
-        return cls(match.name, tags=tags)
+        name, *rest = line.split(maxsplit=1)
+        return cls(name, tags=cls.tag_pattern.findall(''.join(rest)))
 
     @property
     def spec(self):
         return self + ''.join(map(' [{}]'.format, self.tags))
 
 
+class Projects(frozenset):
+    """
+    A set of projects with an index of projects by tag.
+
+    >>> projects = Projects(map(Project.parse, ['a [fork]', 'b', 'c [fork] [x]']))
+    >>> sorted(projects.tagged('fork'))
+    ['a', 'c']
+    >>> projects.tagged('missing')
+    frozenset()
+    """
+
+    @functools.cached_property
+    def index(self):
+        index = collections.defaultdict(set)
+        for project in self:
+            for tag in project.tags:
+                index[tag].add(project)
+        return {tag: frozenset(members) for tag, members in index.items()}
+
+    def tagged(self, tag):
+        return self.index.get(tag, frozenset())
+
+
 def resolve(name):
     """
     >>> projects = list(map(resolve, projects()))
@@ -149,10 +220,45 @@ def resolve(name):
     >>> 'gh://pmxbot/pmxbot.nsfw' in projects
     True
     """
+    from . import github
+
     default = URL(f'https://github.com/{github.username()}/')
     return default.join(name)
 
 
+def resolve_many(names):
+    """
+    Resolve many project names in one pass, returning a mapping
+    of name to URL.
+
+    >>> resolved = resolve_many(projects())
+    >>> resolved['keyring']
+    'gh://jaraco/keyring'
+    >>> resolved['/python/cpython']
+    'gh://python/cpython'
+    """
+    from . import github
+
+    base = URL(f'https://github.com/{github.username()}/').resolved
+    return {name: URL(urllib.parse.urljoin(base, name)).applied for name in names}
+
+
+def remote_heads(urls, ref='HEAD', jobs=16):
+    """
+    Query the commit at ref in each of the remotes concurrently,
+    returning a mapping of url to commit (None if unavailable).
+    """
+
+    def head(url):
+        cmd = ['git', 'ls-remote', url, ref]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        commit, _, _ = proc.stdout.partition('\t')
+        return commit or None
+
+    with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+        return dict(zip(urls, pool.map(head, urls)))
+
+
 def target_for_root(project, root: path.Path = path.Path()):
     """
     Append the prefix of the resolved project name to the target
@@ -167,7 +273,17 @@ def target_for_root(project, root: path.Path = path.Path()):
     return root / prefix
 
 
-def configure_fork(project, repo):
+def _call(cmd, quiet=False, **kwargs):
+    """
+    Run cmd, or if quiet, run it capturing its output, which is then
+    available on any error raised.
+    """
+    if not quiet:
+        return subprocess.check_call(cmd, **kwargs)
+    subprocess.check_output(cmd, stderr=subprocess.STDOUT, **kwargs)
+
+
+def configure_fork(project, repo, quiet=False):
     # special case for calendra - make sure not to fetch tags from upstream.
     if project == 'calendra':
         cmd = 'git config remote.upstream.tagOpt --no-tags'.split()
@@ -176,7 +292,7 @@ def configure_fork(project, repo):
     if 'fork' not in project.tags:
         return
     cmd = ['gh', 'repo', 'fork', '--remote']
-    subprocess.check_call(cmd, cwd=repo)
+    _call(cmd, quiet, cwd=repo)
     cmd = ['git', 'config', '--local', 'branch.main.remote', 'upstream']
     subprocess.check_call(cmd, cwd=repo)
     cmd = ['git', 'remote', 'get-url', 'origin']
@@ -184,7 +300,7 @@ def configure_fork(project, repo):
     cmd = ['git', 'remote', 'set-url', '--push', 'upstream', origin]
     subprocess.check_output(cmd, cwd=repo)
     cmd = ['gh', 'repo', 'set-default', project.lstrip('/')]
-    subprocess.check_call(cmd, cwd=repo)
+    _call(cmd, quiet, cwd=repo)
 
 
 def make_args(**kwargs):
@@ -202,20 +318,221 @@ def make_args(**kwargs):
     )
 
 
-def checkout(project: Project, target: path.Path = path.Path(), **kwargs):
+def checkout(
+    project: Project, target: path.Path = path.Path(), *, source=None, **kwargs
+):
+    """
+    Clone the project into target.
+
+    If source is supplied, clone from that location (such as a local
+    mirror) but set the origin to the project URL.
+
+    If quiet, the output of each step is captured rather than shown.
+    """
     url = resolve(project)
-    cmd = ['git', '-C', target, 'clone', url] + make_args(**kwargs)
-    subprocess.check_call(cmd)
-    repo = target / posixpath.basename(project)
-    configure_fork(project, repo)
+    name = posixpath.basename(project)
+    quiet = kwargs.get('quiet', False)
+    cmd = ['git', '-C', target, 'clone', source or url, name] + make_args(**kwargs)
+    _call(cmd, quiet)
+    repo = target / name
+    if source:
+        cmd = ['git', '-C', repo, 'remote', 'set-url', 'origin', url]
+        subprocess.check_call(cmd)
+    configure_fork(project, repo, quiet)
     return repo
 
 
+class MirrorLock:
+    """
+    A lock on a mirror, held across threads and, where flock is
+    available, across processes through a file beside the mirror.
+    Elsewhere (Windows), it protects only against other threads.
+
+    >>> import pytest
+    >>> _ = pytest.importorskip('fcntl')
+    >>> dir = path.Path(getfixture('tmp_path')) / 'keyring.git'
+    >>> first, second = MirrorLock(dir), MirrorLock(dir)
+    >>> with first:
+    ...     second.acquire(blocking=False)
+    False
+    >>> second.acquire(blocking=False)
+    True
+    >>> second.release()
+    """
+
+    def __init__(self, dir):
+        self.file = f'{dir}.lock'
+        self._lock = threading.Lock()
+
+    def acquire(self, blocking=True):
+        if not self._lock.acquire(blocking):
+            return False
+        if fcntl is None:
+            return True
+        self._handle = open(self.file, 'ab')
+        try:
+            operation = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            fcntl.flock(self._handle, operation)
+        except BlockingIOError:
+            self._handle.close()
+            self._lock.release()
+            return False
+        return True
+
+    def release(self):
+        if fcntl is not None:
+            # closing the file releases the flock
+            self._handle.close()
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class Mirror:
+    """
+    A bare mirror of a remote repository, kept in the cache and
+    fetched incrementally, from which temporary checkouts are cloned.
+
+    >>> mirror = Mirror('gh://jaraco/keyring')
+    >>> mirror.url
+    'https://github.com/jaraco/keyring'
+    >>> mirror.path.basename()
+    Path('keyring-....git')
+    """
+
+    max_size = 10 * 2**30
+    """
+    Total size in bytes above which mirrors are evicted.
+    """
+
+    _prune_lock = threading.Lock()
+    _locks: dict[path.Path, MirrorLock] = {}
+
+    def __init__(self, url):
+        self.url = URL(url).resolved
+        digest = hashlib.sha256(self.url.encode('utf-8')).hexdigest()[:12]
+        name = removesuffix(posixpath.basename(self.url.rstrip('/')), '.git')
+        self.path = self.location() / f'{name}-{digest}.git'
+
+    @staticmethod
+    def location():
+        return cache.location('mirrors')
+
+    @classmethod
+    def lock_for(cls, dir):
+        """
+        Return the lock held while the mirror at dir is in use.
+        """
+        with cls._prune_lock:
+            if dir not in cls._locks:
+                cls._locks[dir] = MirrorLock(dir)
+            return cls._locks[dir]
+
+    @property
+    def lock(self):
+        return self.lock_for(self.path)
+
+    def update(self, quiet=False):
+        """
+        Fetch the latest refs into the mirror, creating it if needed.
+
+        Hold the lock while the mirror is in use to keep it from
+        being pruned.
+        """
+        if self.path.is_dir():
+            cmd = ['git', '-C', self.path, 'fetch', '--quiet', '--prune', '--tags']
+            _call(cmd + ['origin'], quiet)
+        else:
+            self.prune()
+            self._create(quiet)
+        # record the use for LRU eviction
+        os.utime(self.path)
+        return self
+
+    def _create(self, quiet):
+        """
+        Clone the mirror under a temporary name and move it into
+        place when complete, so an interrupted clone is never taken
+        for a mirror.
+        """
+        with path.TempDir(dir=self.location(), prefix='.clone-') as tmp:
+            target = tmp / self.path.name
+            cmd = ['git', 'clone', '--bare', '--quiet', self.url, target]
+            _call(cmd, quiet)
+            cmd = ['git', '-C', target, 'config', 'remote.origin.fetch']
+            subprocess.check_call(cmd + ['+refs/heads/*:refs/heads/*'])
+            try:
+                os.replace(target, self.path)
+            except OSError:
+                # another process created it first
+                if not self.path.is_dir():
+                    raise
+
+    def contains(self, commit, head):
+        """
+        Determine, without fetching, whether head is known to the
+        mirror and descends from commit.
+
+        >>> Mirror('gh://jaraco/keyring').contains('abc123', 'def456')
+        False
+        """
+        if not self.path.is_dir():
+            return False
+        cmd = ['git', '-C', self.path, 'merge-base', '--is-ancestor', commit, head]
+        return not subprocess.run(cmd, capture_output=True).returncode
+
+    @classmethod
+    def prune(cls, max_size=None):
+        """
+        Evict mirrors until the cache fits in max_size, least-recently
+        used first, starting with those for projects no longer listed.
+
+        Mirrors in use, by this process or (where flock is available)
+        another, are left alone, as are clones in progress.
+
+        >>> mirrors = list(map(Mirror, ['gh://jaraco/keyring', 'gh://jaraco/skeleton']))
+        >>> for mirror in mirrors:
+        ...     _ = mirror.path.mkdir()
+        ...     _ = mirror.path.joinpath('HEAD').write_text('ref', encoding='utf-8')
+        >>> with mirrors[1].lock:
+        ...     Mirror.prune(max_size=0)
+        >>> [dir.basename() for dir in Mirror.location().dirs()]
+        [Path('skeleton-....git')]
+        """
+        max_size = cls.max_size if max_size is None else max_size
+        listed = {cls(url).path for url in resolve_many(projects()).values()}
+        with cls._prune_lock:
+            mirrors = sorted(
+                cls.location().dirs('*.git'), key=lambda dir: (dir in listed, dir.mtime)
+            )
+            sizes = {dir: sum(file.size for file in dir.walkfiles()) for dir in mirrors}
+            total = sum(sizes.values())
+            for mirror in mirrors:
+                if total <= max_size:
+                    break
+                # a mirror not yet locked here may be in use elsewhere
+                lock = cls._locks.get(mirror) or MirrorLock(mirror)
+                if not lock.acquire(blocking=False):
+                    continue
+                try:
+                    mirror.rmtree_p()
+                finally:
+                    lock.release()
+                total -= sizes[mirror]
+
+
 @functools.lru_cache
 def _session():
     """
     Return a requests session capable of opening files.
     """
+    import requests
+    import requests_file
+
     session = requests.Session()
     session.mount('file://', requests_file.FileAdapter())
     return session
@@ -227,12 +544,100 @@ def projects_repo():
     return Project(project_path), pathlib.Path(inner_path)
 
 
+_projects_memo: dict[str, tuple[float, Projects]] = {}
+
+
 def projects():
     """
     Load projects from PROJECTS_LIST_URL.
+
+    The list is memoized in-process and cached on disk for
+    PROJECTS_LIST_TTL seconds (default 3600), after which it's
+    revalidated with the server. If the server can't be reached,
+    the last good copy is used. A list in a local file (file://)
+    is instead read directly and reloaded whenever it changes.
+
+    >>> 'keyring' in projects()
+    True
+    >>> projects() is projects()
+    True
+    >>> sorted(projects().tagged('lifted'))
+    ['/pypa/setuptools', 'keyring']
+
+    >>> local = _local_path(os.environ['PROJECTS_LIST_URL'])
+    >>> _ = local.write_text('skeleton', encoding='utf-8')
+    >>> os.utime(local, (0, 0))
+    >>> list(projects())
+    ['skeleton']
+    """
+    url = os.environ['PROJECTS_LIST_URL']
+    local = _local_path(url)
+    if local:
+        modified = local.stat().st_mtime
+        loaded, found = _projects_memo.get(url, (None, Projects()))
+        if loaded != modified:
+            specs = local.read_text(encoding='utf-8').splitlines()
+            found = Projects(map(Project.parse, specs))
+            _projects_memo[url] = modified, found
+        return found
+    ttl = float(os.environ.get('PROJECTS_LIST_TTL', 3600))
+    loaded, found = _projects_memo.get(url, (0.0, Projects()))
+    if time.time() - loaded >= ttl:
+        found = Projects(map(Project.parse, _load_specs(url, ttl)))
+        _projects_memo[url] = time.time(), found
+    return found
+
+
+def _local_path(url):
     """
-    text = _session().get(os.environ['PROJECTS_LIST_URL']).text
-    return set(map(Project.parse, text.splitlines()))
+    Return the path to the file at a file:// URL, or None for
+    any other URL.
+    """
+    if not url.startswith('file:'):
+        return None
+    import urllib.request
+
+    return pathlib.Path(urllib.request.url2pathname(urllib.parse.urlparse(url).path))
+
+
+def _load_specs(url, ttl):
+    """
+    Load the project specs from the disk cache, revalidating
+    with the server if they're older than ttl.
+    """
+    key = hashlib.sha256(url.encode('utf-8')).hexdigest()[:12]
+    file = cache.location('projects') / f'{key}.json'
+    cached = json.loads(file.read_text(encoding='utf-8')) if file.exists() else None
+    if cached and time.time() - cached['fetched'] < ttl:
+        return cached['specs']
+    import requests
+
+    validators = {'ETag': 'If-None-Match', 'Last-Modified': 'If-Modified-Since'}
+    headers = {
+        request: cached['headers'][response]
+        for response, request in validators.items()
+        if cached and cached['headers'].get(response)
+    }
+    try:
+        with _session().get(url, headers=headers, timeout=30) as resp:
+            resp.raise_for_status()
+    except requests.RequestException:
+        if not cached:
+            raise
+        return cached['specs']
+    if resp.status_code == 304:
+        specs, saved = cached['specs'], cached['headers']
+    else:
+        specs, saved = resp.text.splitlines(), {}
+    data = dict(
+        fetched=time.time(),
+        headers={
+            name: resp.headers.get(name) or saved.get(name) for name in validators
+        },
+        specs=specs,
+    )
+    cache.write_text(file, json.dumps(data))
+    return specs
 
 
 def exists(project, target):
@@ -248,17 +653,32 @@ def exists(project, target):
     return target.joinpath(posixpath.basename(resolve(project))).is_dir()
 
 
-def checkout_missing(project, root):
+def checkout_missing(project, root, **kwargs):
     target = target_for_root(project, root)
     if exists(project, target):
         return
     target.mkdir_p()
-    checkout(project, target)
+    checkout(project, target, **kwargs)
 
 
 @contextlib.contextmanager
-def temp_checkout(project, **kwargs):
+def temp_clone(project, **kwargs):
+    """
+    Clone the project into a temporary directory and yield its path
+    without changing the current directory (safe to use from threads).
+
+    The clone is made from a local mirror of the project, so only the
+    changes since the last use are fetched from the remote.
+    """
     with path.TempDir() as dir:
-        repo = checkout(project, dir, depth=50, **kwargs)
-        with repo:
-            yield
+        mirror = Mirror(resolve(project))
+        with mirror.lock:
+            mirror.update(kwargs.get('quiet', False))
+            repo = checkout(project, dir, source=mirror.path, **kwargs)
+        yield repo
+
+
+@contextlib.contextmanager
+def temp_checkout(project, **kwargs):
+    with temp_clone(project, **kwargs) as repo, repo:
+        yield repo
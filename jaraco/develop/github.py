@@ -1,33 +1,100 @@
 import base64
+import concurrent.futures
 import functools
 import getpass
 import itertools
 import os
 import pathlib
 import re
+import time
 
-import keyring
-import nacl.encoding
-import nacl.public
+import requests
+import requests.adapters
 from jaraco.functools import apply
 from more_itertools import unique_everseen
 from requests_toolbelt import sessions
 
-from . import repo
-
 
 class Key(str):
     pass
 
 
+class RateLimitAdapter(requests.adapters.HTTPAdapter):
+    """
+    An adapter that keeps connections alive in a pool and honors
+    GitHub's rate limits, waiting and retrying when a request is
+    throttled.
+
+    The pool blocks when all connections are in use, limiting the
+    number of concurrent requests.
+    """
+
+    retries = 5
+
+    def __init__(self, concurrency):
+        super().__init__(pool_connections=1, pool_maxsize=concurrency, pool_block=True)
+
+    def send(self, request, **kwargs):
+        for _ in range(self.retries):
+            resp = super().send(request, **kwargs)
+            delay = self.throttled(resp)
+            if delay is None:
+                break
+            # release the connection to the pool before waiting
+            resp.content
+            resp.close()
+            time.sleep(delay)
+        return resp
+
+    @staticmethod
+    def throttled(resp, now=time.time):
+        """
+        Return the number of seconds to wait if the response
+        indicates the request was throttled, else None.
+
+        >>> resp = requests.Response()
+        >>> resp.status_code = 200
+        >>> RateLimitAdapter.throttled(resp)
+        >>> resp.status_code = 403
+        >>> RateLimitAdapter.throttled(resp)
+        >>> resp.headers['Retry-After'] = '3'
+        >>> RateLimitAdapter.throttled(resp)
+        3.0
+        >>> del resp.headers['Retry-After']
+        >>> resp.headers.update({
+        ...     'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '1010'})
+        >>> RateLimitAdapter.throttled(resp, now=lambda: 1000)
+        10.0
+        """
+        if resp.status_code not in (403, 429):
+            return None
+        if 'Retry-After' in resp.headers:
+            return float(resp.headers['Retry-After'])
+        if resp.headers.get('X-RateLimit-Remaining') == '0':
+            reset = float(resp.headers.get('X-RateLimit-Reset', 0))
+            return max(reset - now(), 1.0)
+        return None
+
+
 class Repo(str):
+    concurrency = 10
+    """
+    Maximum number of concurrent requests to the API.
+    """
+
     def __init__(self, name):
         self.session = self.get_session()
 
     @classmethod
     @functools.lru_cache
     def get_session(cls):
-        session = sessions.BaseUrlSession('https://api.github.com/repos/')
+        """
+        Return the session for the API at GITHUB_API_URL
+        (default https://api.github.com).
+        """
+        api = os.environ.get('GITHUB_API_URL', 'https://api.github.com')
+        session = sessions.BaseUrlSession(f'{api}/repos/')
+        session.mount(api, RateLimitAdapter(cls.concurrency))
         session.headers.update(
             Accept='application/vnd.github.v3+json',
             Authorization=f'token {cls.load_token()}',
@@ -36,6 +103,8 @@ class Repo(str):
 
     @staticmethod
     def load_token():
+        import keyring
+
         token = os.environ.get("GITHUB_TOKEN") or keyring.get_password(
             'Github',
             username(),
@@ -45,20 +114,30 @@ class Repo(str):
 
     @classmethod
     def detect(cls):
+        from . import repo
+
         return cls(repo.get_project_metadata().project)
 
     @functools.lru_cache
     def get_public_key(self):
-        data = self.session.get(f'{self}/actions/secrets/public-key').json()
+        resp = self.session.get(f'{self}/actions/secrets/public-key')
+        resp.raise_for_status()
+        data = resp.json()
         key = Key(data['key'])
         key.id = data['key_id']
         return key
 
-    def encrypt(self, value):
+    @functools.lru_cache
+    def get_sealed_box(self):
+        import nacl.encoding
+        import nacl.public
+
         src = self.get_public_key().encode('utf-8')
         pub_key = nacl.public.PublicKey(src, nacl.encoding.Base64Encoder())
-        box = nacl.public.SealedBox(pub_key)
-        cipher_text = box.encrypt(value.encode('utf-8'))
+        return nacl.public.SealedBox(pub_key)
+
+    def encrypt(self, value):
+        cipher_text = self.get_sealed_box().encrypt(value.encode('utf-8'))
         return base64.b64encode(cipher_text).decode('utf-8')
 
     def add_secret(self, name, value):
@@ -77,14 +156,48 @@ class Repo(str):
         resp.raise_for_status()
         return resp
 
+    def get_content(self, path):
+        """
+        Load the text of the file at path on the default branch.
+        """
+        raw = dict(Accept='application/vnd.github.raw+json')
+        resp = self.session.get(f'{self}/contents/{path}', headers=raw)
+        resp.raise_for_status()
+        return resp.text
+
+    def get_workflows(self):
+        """
+        Load the text of the repo's workflows through the API.
+        """
+        resp = self.session.get(f'{self}/contents/.github/workflows')
+        if resp.status_code == 404:
+            return []
+        resp.raise_for_status()
+        files = (entry['path'] for entry in resp.json() if entry['type'] == 'file')
+        return list(map(self.get_content, files))
+
     @classmethod
-    @apply(unique_everseen)
     def find_needed_secrets(cls):
         """
         >>> list(Repo.find_needed_secrets())
         ['PYPI_TOKEN']
         """
-        workflows = list(pathlib.Path('.github/workflows').iterdir())
+        workflows = pathlib.Path('.github/workflows').iterdir()
+        return cls.needed_secrets(
+            file.read_text(encoding='utf-8') for file in workflows
+        )
+
+    @classmethod
+    @apply(unique_everseen)
+    def needed_secrets(cls, workflows):
+        r"""
+        Given the text of workflows, find the secrets they need.
+
+        >>> workflow = 'A: ${{ secrets.FOO }}\nB: ${{ secrets.GITHUB_TOKEN }}'
+        >>> list(Repo.needed_secrets([workflow, 'uses: coherent-oss/system']))
+        ['FOO', 'PYPI_TOKEN']
+        """
+        workflows = list(workflows)
         found = itertools.chain.from_iterable(map(cls.find_secrets, workflows))
         inferred = itertools.chain.from_iterable(map(cls.infer_secrets, workflows))
         needed = itertools.chain(found, inferred)
@@ -92,19 +205,63 @@ class Repo(str):
         return itertools.filterfalse(exclusions.__contains__, needed)
 
     @staticmethod
-    def infer_secrets(file):
-        is_coherent = 'uses: coherent-oss/system' in file.read_text(encoding='utf-8')
+    def infer_secrets(workflow):
+        is_coherent = 'uses: coherent-oss/system' in workflow
         return ['PYPI_TOKEN'] * is_coherent
 
     @staticmethod
-    def find_secrets(file):
+    def find_secrets(workflow):
         return (
             match.group(1)
-            for match in re.finditer(
-                r'\${{\s*secrets\.(\w+)\s*}}', file.read_text(encoding='utf-8')
-            )
+            for match in re.finditer(r'\${{\s*secrets\.(\w+)\s*}}', workflow)
         )
 
 
 def username():
     return os.environ.get('GITHUB_USERNAME') or getpass.getuser()
+
+
+def bulk(func, items):
+    """
+    Apply func to each of the items concurrently, sharing the
+    connection pool, and return a mapping of item to result.
+
+    Throttled requests are retried without holding up the others.
+
+    >>> from jaraco.develop import fake
+    >>> monkeypatch = getfixture('monkeypatch')
+    >>> with fake.Service(projects=20, rate_limit=10, window=0.05) as service:
+    ...     for name, value in service.environ.items():
+    ...         monkeypatch.setenv(name, value)
+    ...     Repo.get_session.cache_clear()
+    ...     workflows = bulk(Repo.get_workflows, map(Repo, service.projects))
+    >>> Repo.get_session.cache_clear()
+    >>> len(workflows)
+    20
+    >>> service.requests > 40
+    True
+    """
+    items = list(items)
+    with concurrent.futures.ThreadPoolExecutor(Repo.concurrency) as pool:
+        return dict(zip(items, pool.map(func, items)))
+
+
+def add_secrets(needed, values):
+    """
+    Add secrets to many repos concurrently, where needed maps each
+    repo to the names of the secrets it needs and values maps each
+    name to its value.
+
+    Return a mapping of (repo, name) to the response, or to the
+    error if the secret could not be added.
+    """
+
+    def add(pair):
+        repo, name = pair
+        try:
+            return repo.add_secret(name, values[name])
+        except requests.RequestException as exc:
+            return exc
+
+    pairs = [(Repo(repo), name) for repo, names in needed.items() for name in names]
+    return bulk(add, pairs)
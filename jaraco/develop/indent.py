@@ -1,35 +1,77 @@
 import argparse
+import concurrent.futures
+import fnmatch
 import functools
 import glob
+import itertools
 import os
 import re
+import shutil
+import tempfile
 
 no_tabs_mode = "# tab-width: 4; indent-tabs-mode: nil;"
 tabs_mode = "# tab-width: 4; indent-tabs-mode: t;"
 
 
-def add_mode(mode, file):
+def add_mode(mode, file, dry_run=False):
+    """
+    Add the mode declaration to the top of the file unless
+    already present. Return whether the file changed.
+
+    >>> file = getfixture('tmp_path') / 'sample.py'
+    >>> _ = file.write_bytes(b'pass\\r\\n')
+    >>> add_mode(tabs_mode, file)
+    True
+    >>> add_mode(tabs_mode, file)
+    False
+    >>> file.read_bytes()
+    b'# tab-width: 4; indent-tabs-mode: t;\\r\\npass\\r\\n'
+    """
     with open(file, 'rb') as f:
-        content = f.read()
-    if mode in content:
-        return
-    newline = guess_newline(f)
-    content = mode + newline + content
-    with open(file, 'wb') as f:
-        f.write(content)
+        first_line = f.readline()
+    if mode.encode() in first_line:
+        return False
+    header = mode.encode() + guess_newline(first_line)
+    dry_run or _rewrite(file, lambda lines: itertools.chain([header], lines))
+    return True
+
+
+def guess_newline(line):
+    return b'\r\n' if line.endswith(b'\r\n') else b'\n'
 
 
-def guess_newline(f):
-    if isinstance(f.newlines, str):
-        return f.newlines
-    if isinstance(f.newlines, tuple):
-        return f.newlines[0]
-    return '\n'
+def _rewrite(file, transform):
+    """
+    Stream the lines of the file through transform into a
+    temporary file, then replace the file with it.
+    """
+    dir = os.path.dirname(file) or '.'
+    with (
+        open(file, 'rb') as src,
+        tempfile.NamedTemporaryFile(dir=dir, prefix='.indent-', delete=False) as dst,
+    ):
+        try:
+            dst.writelines(transform(src))
+        except BaseException:
+            dst.close()
+            os.remove(dst.name)
+            raise
+    shutil.copymode(file, dst.name)
+    os.replace(dst.name, file)
 
 
 def _recursive_glob(root, spec):
-    spec = os.path.join([root, '**', spec])
-    return glob.iglob(spec, recursive=True)
+    """
+    Generate the files under root matching spec, skipping
+    hidden directories (like a recursive glob).
+    """
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if not entry.name.startswith('.'):
+                    yield from _recursive_glob(entry.path, spec)
+            elif fnmatch.fnmatch(entry.name, spec):
+                yield entry.path
 
 
 def recursive_glob(spec):
@@ -37,25 +79,75 @@ def recursive_glob(spec):
     Take a single spec and use the first part as the root and the latter
     part as the spec.
     """
-    root, sep, spec = spec.rpartition(os.pathsep)
+    root, sep, spec = spec.rpartition(os.sep)
     root = root or '.'
     return _recursive_glob(root, spec)
 
 
-def remove_tabs_mode(file):
+def _is_mode(line):
+    return (
+        line.startswith(b'#') and b'tab-width' in line and b'indent-tabs-mode' in line
+    )
+
+
+def remove_tabs_mode(file, dry_run=False):
+    """
+    Remove a mode declaration from the top of the file.
+    Return whether the file changed.
+
+    >>> file = getfixture('tmp_path') / 'sample.py'
+    >>> _ = file.write_text(no_tabs_mode + '\\npass\\n', encoding='utf-8')
+    >>> remove_tabs_mode(file)
+    True
+    >>> file.read_text(encoding='utf-8')
+    'pass\\n'
+    >>> remove_tabs_mode(file)
+    False
+    """
     with open(file, 'rb') as f:
-        lines = list(f)
-    if not lines:
-        return
-    first_line = lines[0]
-    if (
-        first_line.startswith('#')
-        and 'tab-width' in first_line
-        and 'indent-tabs-mode' in first_line
-    ):
-        lines = lines[1:]
-    with open(file, 'wb') as f:
-        f.writelines(lines)
+        first_line = f.readline()
+    if not _is_mode(first_line):
+        return False
+    dry_run or _rewrite(file, lambda lines: itertools.islice(lines, 1, None))
+    return True
+
+
+def convert_to_spaces(file, dry_run=False):
+    r"""
+    Replace tab indentation in the file with space indentation.
+    Return whether the file changed.
+
+    >>> file = getfixture('tmp_path') / 'sample.py'
+    >>> _ = file.write_bytes(b'if x:\r\n\tif y:\r\n\t\tpass  # \xe9\ttab\r\n')
+    >>> convert_to_spaces(file)
+    True
+    >>> file.read_bytes()
+    b'if x:\r\n    if y:\r\n        pass  # \xe9\ttab\r\n'
+    >>> convert_to_spaces(file)
+    False
+    """
+    with open(file, 'rb') as f:
+        if not any(line.startswith(b'\t') for line in f):
+            return False
+    dry_run or _rewrite(file, functools.partial(map, _line_to_spaces))
+    return True
+
+
+def _line_to_spaces(line):
+    # latin-1 maps each byte to a character, so any encoding survives
+    return to_spaces(line.decode('latin-1')).encode('latin-1')
+
+
+def process(func, files, jobs=None, dry_run=False):
+    """
+    Apply func to the files across a pool of workers,
+    returning the files that changed (or would change).
+    """
+    func = functools.partial(func, dry_run=dry_run)
+    files = list(files)
+    with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+        changes = list(pool.map(func, files))
+    return [file for file, changed in zip(files, changes) if changed]
 
 
 def set_tabs_mode_cmd():
@@ -84,10 +176,26 @@ def set_tabs_mode_cmd():
     parser.add_argument(
         '-c', '--clear', action="store_const", const=remove_tabs_mode, dest='tabs_mode'
     )
+    parser.add_argument(
+        '-s',
+        '--spaces',
+        action="store_const",
+        const=convert_to_spaces,
+        dest='tabs_mode',
+        help="Convert tab indentation to spaces",
+    )
+    parser.add_argument(
+        '-n', '--dry-run', action='store_true', help="Report without changing files"
+    )
+    parser.add_argument('-j', '--jobs', type=int, help="Number of worker threads")
     parser.add_argument('spec', help="The file spec to change")
     args = parser.parse_args()
-    file_names = args.glob(args.spec)
-    map(args.tabs_mode, file_names)
+    file_names = list(args.glob(args.spec))
+    changed = process(args.tabs_mode, file_names, args.jobs, args.dry_run)
+    for file in changed:
+        print(file)
+    verb = 'would change' if args.dry_run else 'changed'
+    print(f"{len(changed)} of {len(file_names)} files {verb}.")
 
 
 def to_spaces(script):
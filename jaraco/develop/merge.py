@@ -2,19 +2,33 @@
 Facilities for parsing and resolving common merge conflicts.
 """
 
+import collections
 import contextlib
+import email.message
+import fnmatch
+import functools
+import hashlib
+import io
+import mmap
+import operator
 import os
 import re
 import shutil
+import subprocess
 import tempfile
 import textwrap
-import unittest.mock
+import threading
+import time
+import types
 from pathlib import Path
+from typing import Annotated
 
-import jaraco.packaging.metadata
+import typer
 from jaraco.functools import identity
 from jaraco.ui.main import main
 
+from . import cache
+
 sample_conflict = textwrap.dedent(
     """
     start
@@ -51,36 +65,260 @@ class Conflict:
     start
     new
     end
+
+    Each conflict records its offsets in the scanned text.
+
+    >>> sample_conflict[cf.start:cf.end] == sample_conflict[6:-4]
+    True
+
+    Common ancestor sections from the diff3 conflict style are
+    captured, distinct from the base file the mergetool may supply.
+
+    >>> text = '<<<<<<< a\nL\n||||||| b\nB\n=======\nR\n>>>>>>> c\n'
+    >>> cf, = Conflict.find(text, base=Path('base'))
+    >>> cf.left, cf.ancestor_desc, cf.ancestor, cf.right, cf.base.name
+    ('L\n', '||||||| b\n', 'B\n', 'R\n', 'base')
+
+    Bytes (including memory-mapped files) are scanned too, yielding
+    byte offsets and decoded sections.
+
+    >>> cf, = Conflict.find(sample_conflict.encode('utf-8'))
+    >>> cf.start, len(cf.right.splitlines())
+    (6, 3)
+
+    Unterminated conflicts are ignored.
+
+    >>> list(Conflict.find('<<<<<<< HEAD\nleft\n=======\nright\n'))
+    []
     """
 
-    def __init__(self, match, **kw):
-        self.match = match
-        vars(self).update(kw)
+    ancestor_desc = None
+    ancestor = None
+    merge = None
+    root = Path('.')
+    """
+    The root of the repo in which the conflict occurs.
+    """
 
-    def __getattr__(self, name):
-        return self.match.groupdict()[name]
+    def __init__(self, **kw):
+        vars(self).update(kw)
 
     @classmethod
     def read(cls, merge, **kw):
-        return cls.find(merge.read_text(), merge=merge, **kw)
+        return cls.find(merge.read_text(encoding='utf-8'), merge=merge, **kw)
 
     @classmethod
     def find(cls, text, **kw):
-        matches = re.finditer(
-            r'^(?P<left_desc><<<<<<<.*?\n)'
-            r'(?P<left>(.|\n)*?)'
-            r'^(=======\n)'
-            r'(?P<right>(.|\n)*?)'
-            r'^(?P<right_desc>>>>>>>>.*?\n)',
-            text,
-            re.MULTILINE,
+        """
+        Scan text (str or bytes-like) in a single pass, line by line,
+        yielding a Conflict for each complete conflict hunk.
+        """
+        markers = _markers(type(text[:0]))
+        decode = identity if isinstance(text, str) else _decode
+        state = None
+        for offset, line in _lines(text):
+            after = offset + len(line)
+            if state is None and line.startswith(markers.left):
+                state, marks = 'left', dict(start=offset, left=after)
+            elif state == 'left' and line.startswith(markers.ancestor):
+                state = 'ancestor'
+                marks.update(ancestor_desc=offset, ancestor=after)
+            elif (
+                state in ('left', 'ancestor')
+                and line.rstrip(markers.eol) == markers.sep
+            ):
+                state = 'right'
+                marks.update(sep=offset, right=after)
+            elif state == 'right' and line.startswith(markers.right):
+                state = None
+                marks.update(right_desc=offset, end=after)
+                yield cls._from_marks(text, marks, decode, **kw)
+
+    @classmethod
+    def _from_marks(cls, text, marks, decode, **kw):
+        def section(start, end):
+            return decode(text[marks[start] : marks[end]])
+
+        if 'ancestor' in marks:
+            kw.update(
+                ancestor_desc=section('ancestor_desc', 'ancestor'),
+                ancestor=section('ancestor', 'sep'),
+            )
+        return cls(
+            start=marks['start'],
+            end=marks['end'],
+            left_desc=section('start', 'left'),
+            left=section('left', 'ancestor_desc' if 'ancestor' in marks else 'sep'),
+            right=section('right', 'right_desc'),
+            right_desc=section('right_desc', 'end'),
+            **kw,
         )
-        return (cls(match, **kw) for match in matches)
 
     def replace(self, repl, orig):
-        return orig.replace(self.match.group(0), repl)
+        """
+        Replace this conflict in orig (the text in which it was found).
+        """
+        return orig[: self.start] + repl + orig[self.end :]
+
+
+def _lines(text):
+    """
+    Generate each line in text with its offset.
+    """
+    newline = '\n' if isinstance(text, str) else b'\n'
+    pos, size = 0, len(text)
+    while pos < size:
+        end = text.find(newline, pos) + 1 or size
+        yield pos, text[pos:end]
+        pos = end
+
+
+@functools.lru_cache
+def _markers(type_):
+    """
+    Conflict markers as the type of the text being scanned.
+    """
+    markers = dict(left='<<<<<<<', ancestor='|||||||', sep='=======', right='>>>>>>>')
+    encode = identity if type_ is str else operator.methodcaller('encode', 'ascii')
+    return types.SimpleNamespace(
+        eol=encode('\r\n'), **{name: encode(marker) for name, marker in markers.items()}
+    )
+
+
+def _decode(data):
+    return data.decode('utf-8')
+
+
+def splice(text, resolutions):
+    """
+    Rebuild text in one pass, replacing each conflict with its
+    resolution. Resolutions are pairs of conflict and replacement,
+    in the order the conflicts were found.
+
+    >>> conflicts = Conflict.find(sample_conflict)
+    >>> print(splice(sample_conflict, ((cf, 'new\\n') for cf in conflicts)), end='')
+    start
+    new
+    end
+    """
+    encode = identity if isinstance(text, str) else operator.methodcaller('encode')
+    pieces, pos = [], 0
+    for conflict, repl in resolutions:
+        pieces += [text[pos : conflict.start], encode(repl)]
+        pos = conflict.end
+    pieces.append(text[pos:])
+    return text[:0].join(pieces)
+
+
+@contextlib.contextmanager
+def mapped(path):
+    """
+    Map the file at path into memory as read-only bytes.
+    """
+    with path.open('rb') as file:
+        if not os.fstat(file.fileno()).st_size:
+            yield b''
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer
+
+
+class Resolver:
+    r"""
+    A conflict resolver along with cheap criteria indicating the
+    conflicts to which it might apply: a glob for the file name and
+    substrings required on the left or right. The resolver may still
+    decline a conflict by raising an exception.
+
+    Tracks hits, misses and the time spent resolving.
+
+    >>> res = Resolver(lambda conflict: conflict.right, files='*.py', left=['#!'])
+    >>> res.applies_to(Path('setup.py')), res.applies_to(Path('README.rst'))
+    (True, False)
+    >>> cf, = Conflict.find('<<<<<<< a\n#!x\n=======\ny\n>>>>>>> b\n')
+    >>> res.accepts(cf)
+    True
+    >>> res(cf)
+    'y\n'
+    >>> res.hits, res.misses
+    (1, 0)
+    """
+
+    def __init__(self, func, files='*', left=(), right=()):
+        self.func = func
+        self.files = files
+        self.left = left
+        self.right = right
+        self.hits = self.misses = 0
+        self.time = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def name(self):
+        return self.func.__name__
+
+    def applies_to(self, path):
+        return fnmatch.fnmatch(path.name, self.files)
+
+    def accepts(self, conflict):
+        return all(marker in conflict.left for marker in self.left) and all(
+            marker in conflict.right for marker in self.right
+        )
+
+    def __call__(self, conflict):
+        start = time.perf_counter()
+        try:
+            result = self.func(conflict)
+        except Exception:
+            self._record(start, misses=1)
+            raise
+        self._record(start, hits=1)
+        return result
+
+    def _record(self, start, hits=0, misses=0):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.time += time.perf_counter() - start
+
+
+resolvers: list[Resolver] = []
+"""
+The registered resolvers, in the order they are tried.
+"""
+
+
+def resolver(**criteria):
+    """
+    Register the decorated function as a resolver
+    with the given criteria.
+    """
+
+    def register(func):
+        resolvers.append(Resolver(func, **criteria))
+        _resolvers_for.cache_clear()
+        return func
+
+    return register
+
+
+@functools.lru_cache
+def _resolvers_for(name):
+    """
+    Index the resolvers applicable to a file name.
+    """
+    return [res for res in resolvers if res.applies_to(Path(name))]
+
+
+def report():
+    """
+    Print the hits, misses and time for each resolver.
+    """
+    for res in resolvers:
+        print(f'{res.name}: {res.hits} hits, {res.misses} misses, {res.time:.3f}s')
 
 
+@resolver(right=['PROJECT'])
 def resolve_placeholders(conflict):
     """
     If the text "PROJECT" appears in the conflict on the right,
@@ -106,28 +344,83 @@ def load_metadata(conflict):
     If it has a conflict in the pyproject.toml, use the 'local' copy
     to load the metadata. See #19 for rationale.
     """
+    if conflict.merge.name != 'pyproject.toml':
+        return load_cached_metadata(conflict.root)
     with conflict_safe_project(conflict) as dir:
-        return jaraco.packaging.metadata.load(dir)
+        return load_cached_metadata(Path(dir), runner=pretend_version)
+
+
+_metadata_memo: dict[str, email.message.Message] = {}
+
+
+def load_cached_metadata(dir, **options):
+    """
+    Load the metadata for the project in dir, cached in memory and
+    on disk by the content of the project's build configuration, so
+    the metadata is built once for any number of conflicts and
+    mergetool invocations.
+
+    Because the key doesn't include the SCM state, the Version may
+    be stale, so use this only for the project's identity.
+
+    Options are passed to :func:`jaraco.packaging.metadata.load`.
+    """
+    digest = _config_digest(dir)
+    with contextlib.suppress(KeyError):
+        return _metadata_memo[digest]
+    file = cache.location('metadata') / f'{digest}.txt'
+    if file.exists():
+        metadata = email.message_from_string(file.read_text(encoding='utf-8'))
+    else:
+        import jaraco.packaging.metadata
+
+        metadata = jaraco.packaging.metadata.load(dir, **options)
+        cache.write_text(file, metadata.as_string())
+    return _metadata_memo.setdefault(digest, metadata)
+
+
+def _config_digest(dir):
+    """
+    Hash the build configuration of the project in dir.
+
+    >>> tmp_path = getfixture('tmp_path')
+    >>> first = _config_digest(tmp_path)
+    >>> _ = tmp_path.joinpath('pyproject.toml').write_text('[project]', encoding='utf-8')
+    >>> _config_digest(tmp_path) != first
+    True
+    """
+    digest = hashlib.sha256()
+    for name in ('pyproject.toml', 'setup.cfg', 'setup.py'):
+        with contextlib.suppress(FileNotFoundError):
+            digest.update(name.encode('utf-8') + b'\0' + (dir / name).read_bytes())
+    return digest.hexdigest()
 
 
 @contextlib.contextmanager
 def conflict_safe_project(conflict):
     if conflict.merge.name != 'pyproject.toml':
-        yield '.'
+        yield conflict.root
         return
 
-    with tempfile.TemporaryDirectory() as dir, pretend_version():
+    with tempfile.TemporaryDirectory() as dir:
         path = Path(dir)
         shutil.copy(conflict.local, path / 'pyproject.toml')
 
         yield dir
 
 
-@contextlib.contextmanager
-def pretend_version():
-    subs = dict(SETUPTOOLS_SCM_PRETEND_VERSION="0")
-    with unittest.mock.patch.dict(os.environ, subs):
-        yield
+def pretend_version(cmd, cwd=None, extra_environ=None):
+    """
+    Run the build backend with a pretend version, for a project
+    copied away from its SCM.
+
+    The variable is passed to the backend rather than set in this
+    process, where it would be seen by concurrent builds.
+    """
+    import pyproject_hooks
+
+    subs = dict(extra_environ or {}, SETUPTOOLS_SCM_PRETEND_VERSION="0")
+    pyproject_hooks.quiet_subprocess_runner(cmd, cwd, subs)
 
 
 def _retain_rtd(left):
@@ -158,6 +451,7 @@ def _enable_rtd(text):
     return re.sub(r'^\.\. ', '', text, flags=re.MULTILINE)
 
 
+@resolver(left=['#!'])
 def resolve_shebang(conflict):
     assert conflict.left.startswith('#!')
     assert conflict.left.count('\n') < 5
@@ -165,16 +459,148 @@ def resolve_shebang(conflict):
 
 
 def resolve(conflict):
-    for resolver in (resolve_placeholders, resolve_shebang):
+    """
+    Resolve the conflict with the first applicable resolver
+    that accepts it.
+    """
+    name = conflict.merge.name if conflict.merge else ''
+    candidates = _resolvers_for(name) if name else resolvers
+    for res in candidates:
+        if not res.accepts(conflict):
+            continue
         with contextlib.suppress(Exception):
-            return resolver(conflict)
+            return res(conflict)
     raise ValueError("Unable to resolve")
 
 
+def resolve_file(merge, **paths):
+    """
+    Resolve the conflicts in the merge file in place.
+
+    Return the number of conflicts resolved.
+    """
+    with mapped(merge) as text:
+        conflicts = list(Conflict.find(text, merge=merge, **paths))
+        res = splice(text, ((conflict, resolve(conflict)) for conflict in conflicts))
+    merge.write_bytes(res)
+    return len(conflicts)
+
+
+def unmerged(root):
+    """
+    Return the blob for each stage of each unmerged path in the repo.
+    """
+    cmd = ['git', 'ls-files', '--unmerged', '-z']
+    output = subprocess.check_output(cmd, cwd=root, text=True, encoding='utf-8')
+    stages: dict[str, dict[int, str]] = collections.defaultdict(dict)
+    for entry in filter(None, output.split('\0')):
+        info, path = entry.split('\t', 1)
+        _mode, blob, stage = info.split()
+        stages[path][int(stage)] = blob
+    return stages
+
+
+def read_blobs(blobs, root):
+    """
+    Read the content of many blobs through a single cat-file stream.
+    """
+    blobs = list(blobs)
+    request = ''.join(f'{blob}\n' for blob in blobs).encode('ascii')
+    cmd = ['git', 'cat-file', '--batch']
+    proc = subprocess.run(cmd, cwd=root, input=request, capture_output=True, check=True)
+    stream = io.BytesIO(proc.stdout)
+    for blob in blobs:
+        _, type_, *size = stream.readline().split()
+        if type_ == b'missing':
+            continue
+        yield blob, stream.read(int(size[0]))
+        stream.read(1)
+
+
+def merge_all(root=Path('.')):
+    r"""
+    Resolve every unmerged file in the repo at root in one process,
+    staging the files that are fully resolved.
+
+    Return the paths that could not be resolved, including any that
+    fail to resolve for other reasons (such as not being UTF-8).
+
+    >>> root = getfixture('tmp_path')
+    >>> def git(*args):
+    ...     cmd = ['git', '-c', 'user.name=A', '-c', 'user.email=a@example.com']
+    ...     return subprocess.run(cmd + list(args), cwd=root, capture_output=True)
+    >>> def commit(shebang, data, notes):
+    ...     _ = root.joinpath('script.py').write_text(shebang, encoding='utf-8')
+    ...     _ = root.joinpath('data.txt').write_bytes(data)
+    ...     _ = root.joinpath('notes.txt').write_text(notes, encoding='utf-8')
+    ...     _ = git('add', '.')
+    ...     _ = git('commit', '--quiet', '--message', shebang)
+    >>> _ = git('init', '--quiet')
+    >>> commit('#!python\n', b'x\n', 'a\n')
+    >>> _ = git('checkout', '--quiet', '-b', 'upstream')
+    >>> commit('#!/usr/bin/python3\n', b'\xfe\n', 'c\n')
+    >>> _ = git('checkout', '--quiet', '-')
+    >>> commit('#!/usr/bin/env python\n', b'\xff\n', 'b\n')
+    >>> git('merge', 'upstream').returncode
+    1
+    >>> stages = unmerged(root)
+    >>> sorted(stages)
+    ['data.txt', 'notes.txt', 'script.py']
+    >>> sorted(blob for _, blob in read_blobs(stages['notes.txt'].values(), root))
+    [b'a\n', b'b\n', b'c\n']
+    >>> merge_all(root)
+    ['data.txt', 'notes.txt']
+    >>> root.joinpath('script.py').read_text(encoding='utf-8')
+    '#!/usr/bin/python3\n'
+    >>> sorted(unmerged(root))
+    ['data.txt', 'notes.txt']
+    """
+    root = Path(root)
+    stages = unmerged(root)
+    blobs = dict(
+        read_blobs({blob for shas in stages.values() for blob in shas.values()}, root)
+    )
+    resolved, unresolved = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for index, (path, shas) in enumerate(stages.items()):
+            versions = {}
+            for stage, name in (1, 'base'), (2, 'local'), (3, 'remote'):
+                if shas.get(stage) not in blobs:
+                    continue
+                versions[name] = Path(tmp, str(index), name)
+                versions[name].parent.mkdir(exist_ok=True)
+                versions[name].write_bytes(blobs[shas[stage]])
+            if not {'local', 'remote'} <= versions.keys():
+                unresolved.append(path)
+                continue
+            try:
+                count = resolve_file(root / path, root=root, **versions)
+            except Exception:
+                count = 0
+            (resolved if count else unresolved).append(path)
+    if resolved:
+        subprocess.check_call(['git', 'add', '--', *resolved], cwd=root)
+    return unresolved
+
+
 @main
-def merge(base: Path, local: Path, remote: Path, merge: Path):
-    conflicts = Conflict.read(**locals())
-    res = merge.read_text()
-    for conflict in conflicts:
-        res = conflict.replace(resolve(conflict), res)
-    merge.write_text(res)
+def merge(
+    base: Annotated[Path | None, typer.Argument()] = None,
+    local: Annotated[Path | None, typer.Argument()] = None,
+    remote: Annotated[Path | None, typer.Argument()] = None,
+    merge: Annotated[Path | None, typer.Argument()] = None,
+    all_: Annotated[
+        bool, typer.Option('--all', help="Resolve all unmerged files in the repo.")
+    ] = False,
+):
+    if not all_:
+        if None in (base, local, remote, merge):
+            raise typer.BadParameter(
+                "base, local, remote, and merge are required without --all."
+            )
+        resolve_file(merge, base=base, local=local, remote=remote)
+        return
+    unresolved = merge_all()
+    for path in unresolved:
+        print("Unable to resolve", path)
+    raise typer.Exit(bool(unresolved))
@@ -2,8 +2,10 @@
 Routine to run a command across all projects.
 """
 
+import concurrent.futures
 import functools
 import subprocess
+import sys
 from typing import Annotated
 
 import typer
@@ -12,6 +14,84 @@ from jaraco.ui.main import main
 from . import filters, git
 
 
+def run_streaming(project, args):
+    """
+    Check out the project and run args in it, streaming output.
+    Return the exit code.
+    """
+    print(project, flush=True)
+    try:
+        with git.temp_checkout(project, quiet=True):
+            code = subprocess.Popen(args).wait()
+    except Exception as exc:
+        code, output = failure(exc)
+        sys.stdout.buffer.write(output)
+    print(flush=True)
+    return code
+
+
+def run_captured(project, args):
+    """
+    Check out the project and run args in it, capturing the
+    combined output (including that of the checkout). Return the
+    exit code and the output.
+    """
+    try:
+        with git.temp_clone(project, quiet=True) as repo:
+            proc = subprocess.run(
+                args,
+                cwd=repo,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            )
+    except Exception as exc:
+        return failure(exc)
+    return proc.returncode, proc.stdout
+
+
+def failure(exc):
+    """
+    Return the exit code and the output reporting the failure
+    to check out or run in a project.
+    """
+    if isinstance(exc, subprocess.CalledProcessError):
+        output = exc.output or b''
+        return exc.returncode, output + f'Checkout failed: {exc}\n'.encode()
+    return 1, f'Failed: {exc!r}\n'.encode()
+
+
+def emit(project, output):
+    """
+    Write the output for a project under a header in one piece.
+    """
+    sys.stdout.buffer.write(f'{project}\n'.encode() + output + b'\n')
+    sys.stdout.flush()
+
+
+def run_parallel(projects, args, jobs):
+    with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+        futures = {
+            pool.submit(run_captured, project, args): project for project in projects
+        }
+        for future in concurrent.futures.as_completed(futures):
+            code, output = future.result()
+            emit(futures[future], output)
+            yield futures[future], code
+
+
+def summarize(statuses):
+    """
+    Report the aggregate exit status and fail if any project failed.
+    """
+    failed = {project: code for project, code in statuses.items() if code}
+    print(f"Ran in {len(statuses)} projects, {len(failed)} failed.")
+    for project in sorted(failed):
+        print(f"  {project}: exit status {failed[project]}")
+    if failed:
+        raise typer.Exit(1)
+
+
 @functools.partial(
     main,
     app=typer.Typer(
@@ -26,12 +106,19 @@ def run(
         list[filters.Keyword],
         typer.Option('--keyword', '-k', parser=filters.Keyword),
     ] = [],
+    jobs: Annotated[
+        int,
+        typer.Option(
+            '--jobs', '-j', min=1, help="Number of projects to run concurrently."
+        ),
+    ] = 1,
     *,
     ctx: typer.Context,
 ):
     selectors = filters.Selectors(tag + keyword)
-    for project in filter(selectors, git.projects()):
-        print(project, flush=True)
-        with git.temp_checkout(project, quiet=True):
-            subprocess.Popen(ctx.args).wait()
-        print(flush=True)
+    projects = selectors.select(git.projects())
+    if jobs == 1:
+        results = ((project, run_streaming(project, ctx.args)) for project in projects)
+    else:
+        results = run_parallel(projects, ctx.args, jobs)
+    summarize(dict(results))
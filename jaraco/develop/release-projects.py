@@ -0,0 +1,129 @@
+"""
+Release all projects with pending changes.
+
+Each selected project is checked out and its news fragments inspected
+to determine whether it's ready for release, and at what version.
+The ready projects are then finalized (changelog, commit and tag),
+pushed, and released on GitHub, concurrently.
+"""
+
+import concurrent.futures
+import contextlib
+import pathlib
+import subprocess
+import types
+from typing import Annotated
+
+import typer
+from jaraco.ui.main import main
+
+from . import filters, finalize, git, github, towncrier
+
+
+def assess(project):
+    """
+    Check out the project and determine its readiness for release.
+
+    If ready, the outcome holds the checkout (and a context to clean
+    it up) for the release.
+    """
+    outcome = types.SimpleNamespace(name=project, status='unchanged', detail='')
+    with contextlib.ExitStack() as stack:
+        repo = stack.enter_context(git.temp_clone(project, quiet=True))
+        fragments = towncrier.news_fragments(pathlib.Path(repo, 'newsfragments'))
+        if not fragments:
+            return outcome
+        try:
+            towncrier.check_changes(fragments)
+            kind = towncrier.release_kind(fragments)
+        except ValueError as exc:
+            outcome.status, outcome.detail = 'invalid', str(exc)
+            return outcome
+        outcome.version = towncrier.get_version(fragments, root=repo)
+        outcome.status = 'ready'
+        outcome.detail = f'{kind} release {outcome.version}'
+        outcome.repo = repo
+        outcome.cleanup = stack.pop_all()
+    return outcome
+
+
+def release(outcome, repo_name):
+    """
+    Finalize the ready project, push it, and create the GitHub release.
+    """
+    with outcome.cleanup:
+        tag = finalize.finalize_version(outcome.version, root=outcome.repo)
+        cmd = ['git', 'push', '--quiet', '--follow-tags']
+        subprocess.check_call(cmd, cwd=outcome.repo)
+        github.Repo(repo_name).create_release(tag)
+    outcome.status = 'released'
+    return outcome
+
+
+def safe_assess(project):
+    """
+    Assess the project, capturing any failure as an outcome rather
+    than interrupting the other projects.
+    """
+    try:
+        return assess(project)
+    except Exception as exc:
+        detail = str(exc) or type(exc).__name__
+        return types.SimpleNamespace(name=project, status='failed', detail=detail)
+
+
+def safe_release(outcome, repo_name):
+    """
+    Release the project, capturing a failure in the outcome.
+    """
+    try:
+        return release(outcome, repo_name)
+    except Exception as exc:
+        outcome.status, outcome.detail = 'failed', str(exc) or type(exc).__name__
+        return outcome
+
+
+def report(outcomes):
+    for outcome in sorted(outcomes, key=lambda outcome: outcome.name):
+        print(f'{outcome.name}: {outcome.status} {outcome.detail}'.rstrip())
+
+
+@main
+def run(
+    tag: Annotated[
+        list[filters.Tag], typer.Option('--tag', '-t', parser=filters.Tag)
+    ] = [],
+    keyword: Annotated[
+        list[filters.Keyword],
+        typer.Option('--keyword', '-k', parser=filters.Keyword),
+    ] = [],
+    dry_run: Annotated[
+        bool, typer.Option(help="Only report the projects ready for release.")
+    ] = False,
+    jobs: Annotated[
+        int,
+        typer.Option('--jobs', '-j', min=1, help="Projects to process concurrently."),
+    ] = 8,
+):
+    projects = git.projects()
+    selected = filters.Selectors(tag + keyword).select(
+        projects - projects.tagged('fork')
+    )
+    with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+        outcomes = list(pool.map(safe_assess, selected))
+        report(outcomes)
+        ready = [outcome for outcome in outcomes if outcome.status == 'ready']
+        if dry_run:
+            for outcome in ready:
+                outcome.cleanup.close()
+            return
+        urls = git.resolve_many(outcome.name for outcome in ready)
+        names = [urls[outcome.name].path.strip('/') for outcome in ready]
+        print()
+        report(pool.map(safe_release, ready, names))
+    released = [outcome for outcome in outcomes if outcome.status == 'released']
+    failed = [outcome.name for outcome in outcomes if outcome.status == 'failed']
+    print(f"Released {len(released)} of {len(outcomes)} projects.")
+    if failed:
+        print(f"Failed for {', '.join(sorted(failed))}.")
+        raise typer.Exit(1)
@@ -3,14 +3,18 @@ import re
 import types
 import urllib.parse
 
-import jaraco.packaging.metadata
+placeholder = re.compile(r'(PROJECT\w+)')
 
 
 def get_project_metadata():
+    import jaraco.packaging.metadata
+
     return process(jaraco.packaging.metadata.load('.'))
 
 
 def process(metadata):
+    import jaraco.packaging.metadata
+
     url = jaraco.packaging.metadata.hunt_down_url(metadata)
     version = metadata['Version']
     project = urllib.parse.urlparse(url).path.strip('/')
@@ -18,16 +22,60 @@ def process(metadata):
     return types.SimpleNamespace(**locals())
 
 
-def substitute_name(match, metadata):
+@functools.lru_cache
+def substitutions(metadata):
+    """
+    Compute the placeholder substitutions for the project.
+    """
     subs = process(metadata)
-    lookup = dict(
+    return dict(
         PROJECT_PATH=subs.project,
         PROJECT=subs.name,
         PROJECT_RTD=subs.name.replace('.', '').lower(),
     )
-    return lookup[match.group(0)]
+
+
+def substitute_name(match, metadata):
+    return substitutions(metadata)[match.group(0)]
+
+
+class Template:
+    """
+    Text with placeholders, parsed once to be rendered for any
+    number of projects.
+
+    >>> tmpl = Template('Docs for PROJECT_PATH at PROJECT_RTD.')
+    >>> tmpl.render(dict(PROJECT_PATH='jaraco/skeleton', PROJECT_RTD='skeleton'))
+    'Docs for jaraco/skeleton at skeleton.'
+    """
+
+    def __init__(self, text):
+        self.parts = placeholder.split(text)
+
+    def render(self, lookup):
+        parts = self.parts.copy()
+        parts[1::2] = map(lookup.__getitem__, parts[1::2])
+        return ''.join(parts)
+
+
+@functools.lru_cache(maxsize=256)
+def template(text):
+    return Template(text)
 
 
 def sub_placeholders(input, metadata):
-    replacer = functools.partial(substitute_name, metadata=metadata)
-    return re.sub(r'PROJECT\w+', replacer, input)
+    return template(input).render(substitutions(metadata))
+
+
+def render_all(templates, metadatas):
+    """
+    Render each of the templates (a mapping of key to text) for
+    each project's metadata, parsing each template once.
+
+    Generate, for each of the metadatas, a mapping of key to the
+    rendered text.
+    """
+    parsed = {key: template(text) for key, text in templates.items()}
+    for metadata in metadatas:
+        lookup = substitutions(metadata)
+        yield {key: tmpl.render(lookup) for key, tmpl in parsed.items()}
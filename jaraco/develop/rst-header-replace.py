@@ -1,6 +1,21 @@
+"""
+Replace the character used to underline reStructuredText headings.
+
+Filters stdin to stdout or, given files or directories, rewrites
+every ``.rst`` file in place (in parallel), touching only the files
+that change.
+"""
+
+import concurrent.futures
+import functools
+import os
 import re
 import sys
+import tempfile
+from typing import Annotated
 
+import path
+import typer
 from jaraco.ui.main import main
 
 
@@ -12,15 +27,80 @@ def replace_len(char):
     return replacer
 
 
+@functools.lru_cache
+def heading_pattern(char):
+    return re.compile(f'^(?P<heading>({re.escape(char)})+)$', flags=re.MULTILINE)
+
+
+def replace(text, before, after):
+    """
+    >>> replace('Title\\n-----\\n\\nnot -- a heading\\n', '-', '=')
+    'Title\\n=====\\n\\nnot -- a heading\\n'
+    """
+    return heading_pattern(before).sub(replace_len(after), text)
+
+
+def filter_stream(before, after, input=sys.stdin, output=sys.stdout, size=2**16):
+    """
+    Replace headings in the input, reading whole lines in batches.
+    """
+    for lines in iter(functools.partial(input.readlines, size), []):
+        output.write(replace(''.join(lines), before, after))
+
+
+def rewrite(file, before, after):
+    """
+    Replace headings in the file, writing atomically and only if
+    changed. Return whether the file changed.
+    """
+    with open(file, encoding='utf-8', newline='') as strm:
+        text = strm.read()
+    new = replace(text, before, after)
+    if new == text:
+        return False
+    fd, tmp = tempfile.mkstemp(dir=file.parent, prefix=f'.{file.name}.')
+    try:
+        with open(fd, 'w', encoding='utf-8', newline='') as strm:
+            strm.write(new)
+        os.chmod(tmp, file.stat().st_mode)
+        os.replace(tmp, file)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return True
+
+
+def find_rst(paths):
+    """
+    Generate the files among paths, and the ``.rst`` files
+    under any directories, skipping hidden directories.
+    """
+    for item in paths:
+        if not item.is_dir():
+            yield item
+            continue
+        for dir, dirs, files in os.walk(item):
+            dirs[:] = [name for name in dirs if not name.startswith('.')]
+            yield from (
+                path.Path(dir) / name for name in files if name.endswith('.rst')
+            )
+
+
 @main
-def run(before, after):
+def run(
+    before: str,
+    after: str,
+    paths: Annotated[list[path.Path], typer.Argument(parser=path.Path)] = [],
+    jobs: Annotated[
+        int, typer.Option('--jobs', '-j', min=1, help="Files to rewrite concurrently.")
+    ] = 8,
+):
     assert len(before) == 1
     assert len(after) == 1
-    for line in sys.stdin:
-        repl = re.sub(
-            f'^(?P<heading>({re.escape(before)})+)$',
-            replace_len(after),
-            line,
-            flags=re.MULTILINE,
-        )
-        sys.stdout.write(repl)
+    if not paths:
+        return filter_stream(before, after)
+    files = list(find_rst(paths))
+    update = functools.partial(rewrite, before=before, after=after)
+    with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+        for file, changed in zip(files, pool.map(update, files)):
+            changed and print(file)
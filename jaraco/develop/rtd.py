@@ -1,14 +1,20 @@
 import functools
+import os
 
-import keyring
 from requests_toolbelt import sessions
 
-url = 'https://readthedocs.org/'
+service = 'https://readthedocs.org/'
+url = os.environ.get('READTHEDOCS_URL', service)
 
 
 @functools.lru_cache
 def session():
-    auth = 'Token ' + keyring.get_password(url, 'token')
+    import keyring
+
+    token = os.environ.get('READTHEDOCS_TOKEN') or keyring.get_password(
+        service, 'token'
+    )
+    auth = 'Token ' + token
     session = sessions.BaseUrlSession(url + 'api/v3/')
     session.headers = dict(Authorization=auth)
     return session
@@ -1,11 +1,17 @@
 import collections
+import functools
+import hashlib
+import os
 import pathlib
 import subprocess
 import sys
+import unittest.mock
 
 from jaraco.vcs import repo
 from jaraco.versioning import semver
 
+from . import cache
+
 _release_bumps = collections.defaultdict(
     feature='minor',
     bugfix='patch',
@@ -27,53 +33,123 @@ def _release_bump(file):
     return _release_bumps[type_]
 
 
-def news_fragments():
+def news_fragments(path=pathlib.Path('newsfragments')):
+    """
+    Index the news fragments in one scan of the directory.
+
+    >>> news_fragments(getfixture('tmp_path') / 'missing')
+    []
+    """
     except_ = 'README.rst', '.gitignore'
-    path = pathlib.Path('newsfragments')
-    return (file for file in path.glob('*') if file.name not in except_)
+    try:
+        with os.scandir(path) as entries:
+            return [path / entry.name for entry in entries if entry.name not in except_]
+    except FileNotFoundError:
+        return []
 
 
-def release_kind():
+def release_kind(fragments=None):
     """
     Determine which release to make based on the files in the
     changelog.
     """
-    bumps = map(_release_bump, news_fragments())
+    fragments = news_fragments() if fragments is None else fragments
+    bumps = map(_release_bump, fragments)
     # use min here as 'major' < 'minor' < 'patch'
     return min(bumps, default='patch')
 
 
-def check_changes():
+def check_changes(fragments=None):
     """
     Verify that all of the news fragments have the appropriate names.
     """
+    fragments = news_fragments() if fragments is None else fragments
     unrecognized = [
         str(file)
-        for file in news_fragments()
+        for file in fragments
         if not any(f".{key}" in file.suffixes for key in _release_bumps)
     ]
     if unrecognized:
         raise ValueError(f"Some news fragments have invalid names: {unrecognized}")
 
 
-def get_version():
+def _version_key(kind, root='.'):
+    """
+    Identify the inputs to the next version: the HEAD and tags of
+    the repo at root, and the kind of release. Return None if they
+    can't be determined.
+    """
+    cmd = ['git', 'show-ref', '--head', '--tags']
+    proc = subprocess.run(cmd, cwd=root, capture_output=True, encoding='utf-8')
+    if proc.returncode not in (0, 1) or not proc.stdout:
+        return None
+    parts = proc.stdout, kind
+    return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def get_version(fragments=None, root='.'):
     """
+    Compute the next version for the repo at root, cached for its
+    HEAD and tags and the kind of release the fragments make.
+
     >>> str(get_version())
     '...'
+    >>> get_version() == get_version()
+    True
+    """
+    if fragments is None:
+        fragments = news_fragments(pathlib.Path(root, 'newsfragments'))
+    kind = release_kind(fragments)
+    key = _version_key(kind, root)
+    file = key and cache.location('towncrier') / f'{key}.txt'
+    if file and file.exists():
+        return file.read_text(encoding='utf-8')
+    version = str(repo(root).get_next_version(kind))
+    file and cache.write_text(file, version)
+    return version
+
+
+@functools.lru_cache
+def _template(source, **options):
+    import jinja2
+
+    return jinja2.Template(source, **options)
+
+
+def run(command, *args, version=None, root=None):
+    """
+    Run the towncrier command in-process, passing the version to
+    build. Compiled templates are cached, so that building many
+    projects' changelogs in one process renders each template
+    once.
+
+    If root is given, run the command for the project there in a
+    separate process instead, as towncrier works in (and runs git
+    in) the current directory, which is shared by all threads.
     """
-    return repo().get_next_version(release_kind())
-
-
-def run(command, *args):
-    cmd = (
-        sys.executable,
-        '-m',
-        'towncrier',
-        command,
-        '--version',
-        semver(get_version()),
-    ) + args
-    subprocess.check_call(cmd)
+    if command == 'build':
+        args = ('--version', semver(version or get_version(root=root or '.')), *args)
+    argv = [command, *args]
+    if root is not None:
+        cmd = [sys.executable, '-m', 'towncrier', *argv]
+        subprocess.check_call(cmd, cwd=root)
+        return
+
+    import click
+    from towncrier import _builder, _shell
+
+    try:
+        with unittest.mock.patch.object(_builder, 'Template', _template):
+            _shell.cli.main(argv, prog_name='towncrier', standalone_mode=False)
+    except click.ClickException as exc:
+        exc.show()
+        code = exc.exit_code
+    except SystemExit as exc:
+        code = exc.code
+    else:
+        code = 0
+    if code:
+        raise subprocess.CalledProcessError(code, ['towncrier', *argv])
 
 
 if __name__ == '__main__':
@@ -1,55 +1,220 @@
 """
 Mechanized merging of an upstream repo across all projects.
 
-Relies on 'known-merge' tool, which must be configured with
-git thus:
+Known conflicts are resolved in-process by
+:func:`jaraco.develop.merge.merge_all`, the same resolution offered
+to git as the 'known-merge' tool, configured thus:
 
 [mergetool "known-merge"]
 cmd = py -m jaraco.develop.merge "$BASE" "$LOCAL" "$REMOTE" "$MERGED"
 trustExitCode = true
+
+Projects are cloned, merged and pushed concurrently. Any project with
+conflicts that cannot be resolved automatically is set aside and
+handed to the interactive mergetool, one at a time, after the
+unattended merges are complete.
+
+The base commit merged into each project is recorded, so later runs
+check out only the projects that are behind the base.
 """
 
 from __future__ import annotations
 
+import concurrent.futures
+import contextlib
 import functools
+import hashlib
+import pathlib
 import shutil
 import subprocess
+import threading
+import types
 from typing import Annotated
 
-import subprocess_tee
 import typer
 from jaraco.ui.main import main
 
-from . import filters, git
+from . import cache, filters, git, merge
+
+_captured = dict(
+    stdin=subprocess.DEVNULL,
+    stdout=subprocess.PIPE,
+    stderr=subprocess.STDOUT,
+    text=True,
+)
+
+
+class State(dict):
+    """
+    The base commit last merged into each project, kept as
+    'project commit' lines so that interrupted runs lose nothing.
+    Any line cut short by an interruption is ignored.
+
+    >>> state = State('gh://jaraco/skeleton', None)
+    >>> state.record('keyring', 'abc123')
+    >>> with state.path.open('a', encoding='utf-8') as file:
+    ...     _ = file.write('pmxbot')
+    >>> State('gh://jaraco/skeleton', None)
+    {'keyring': 'abc123'}
+    """
+
+    def __init__(self, base, branch):
+        key = hashlib.sha256(f'{base}#{branch}'.encode('utf-8')).hexdigest()[:12]
+        self.path = cache.location('update-projects') / f'{key}.txt'
+        lines = (
+            self.path.lines(encoding='utf-8', retain=False)
+            if self.path.exists()
+            else []
+        )
+        super().__init__(parts for parts in map(str.split, lines) if len(parts) == 2)
+        self._lock = threading.Lock()
 
+    def record(self, project, commit):
+        with self._lock, self.path.open('a', encoding='utf-8') as file:
+            file.write(f'{project} {commit}\n')
+        self[project] = commit
 
-def handle_rename(old_name, new_name):
-    status = subprocess.check_output(['git', 'status', '--porcelain'], text=True)
+
+def behind(projects, base, branch, state):
+    """
+    Generate the projects not known to contain the head of the base.
+
+    A project is known to contain the head if it was recorded as
+    merged, or if its local mirror shows its remote head descending
+    from it (recorded for next time). If the head of the base can't
+    be determined, all projects are behind.
+    """
+    ref = f'refs/heads/{branch}' if branch else 'HEAD'
+    head = git.remote_heads([base], ref)[base]
+    pending = [
+        project for project in projects if not head or state.get(project) != head
+    ]
+    urls = git.resolve_many(pending)
+    mirrored = [url for url in urls.values() if git.Mirror(url).path.is_dir()]
+    heads = git.remote_heads(mirrored) if head else {}
+    for project in pending:
+        remote = heads.get(urls[project])
+        if remote and git.Mirror(urls[project]).contains(head, remote):
+            state.record(project, head)
+            continue
+        yield project
+
+
+def handle_rename(old_name, new_name, cwd=None):
+    cmd = ['git', 'status', '--porcelain']
+    status = subprocess.check_output(cmd, text=True, cwd=cwd)
     if f'UD {old_name}' not in status:
         return
-    shutil.copyfile(old_name, new_name)
-    subprocess.check_call(['git', 'rm', old_name])
-    subprocess.check_call(['git', 'add', new_name])
+    repo = pathlib.Path(cwd or '.')
+    shutil.copyfile(repo / old_name, repo / new_name)
+    subprocess.check_call(['git', 'rm', '--quiet', old_name], cwd=cwd)
+    subprocess.check_call(['git', 'add', new_name], cwd=cwd)
 
 
-def update_project(name, base, branch=None, dry_run=False):
-    if set(name.tags) & {'fork', 'base'}:
-        return
-    print('\nupdating', name)
-    with git.temp_checkout(name):
+def run_captured(cmd, repo, outcome):
+    """
+    Run cmd in repo, appending its output to the outcome.
+    """
+    proc = subprocess.run(cmd, cwd=repo, **_captured)
+    outcome.output += proc.stdout
+    return proc
+
+
+def push(repo, outcome, dry_run=False):
+    dry_run or run_captured(['git', 'push'], repo, outcome).check_returncode()
+
+
+def merge_unattended(name, base, branch=None, dry_run=False):
+    """
+    Clone the project, merge the base into it and push, resolving
+    any known conflicts.
+
+    Return an outcome with the captured output and a status. If the
+    conflicts need interactive resolution, the outcome is 'deferred'
+    and holds the checkout (and a context to clean it up) for later.
+    """
+    outcome = types.SimpleNamespace(name=name, status='updated', output='')
+    with contextlib.ExitStack() as stack:
+        repo = stack.enter_context(git.temp_clone(name, quiet=True))
         cmd = ['git', 'pull', base, branch, '--no-edit']
-        proc = subprocess_tee.run(list(filter(None, cmd)))
+        proc = run_captured(list(filter(None, cmd)), repo, outcome)
+        cmd = ['git', 'rev-parse', '--verify', '--quiet', 'FETCH_HEAD']
+        outcome.base = subprocess.run(cmd, cwd=repo, **_captured).stdout.strip()
         if proc.returncode:
-            if 'unrelated histories' in proc.stderr:
-                return
-            handle_rename('CHANGES.rst', 'NEWS.rst')
-            try:
-                subprocess.check_call(['git', 'mergetool', '-t', 'known-merge'])
-            except subprocess.CalledProcessError:
-                subprocess.check_call(['git', 'mergetool'])
-            subprocess.check_call(['git', 'commit', '--no-edit'])
-        dry_run or subprocess.check_call(['git', 'push'])
-        return name
+            if 'unrelated histories' in proc.stdout:
+                outcome.status = 'unrelated'
+                return outcome
+            handle_rename('CHANGES.rst', 'NEWS.rst', cwd=repo)
+            unresolved = merge.merge_all(repo)
+            if unresolved:
+                outcome.output += f"Unable to resolve {', '.join(unresolved)}\n"
+                outcome.status = 'deferred'
+                outcome.repo = repo
+                outcome.cleanup = stack.pop_all()
+                return outcome
+            cmd = ['git', 'commit', '--no-edit']
+            run_captured(cmd, repo, outcome).check_returncode()
+        push(repo, outcome, dry_run)
+    return outcome
+
+
+def merge_interactive(outcome, dry_run=False):
+    """
+    Complete a deferred merge using the interactive mergetool,
+    capturing a failure in the outcome.
+    """
+    print('\nresolving', outcome.name, flush=True)
+    with outcome.cleanup:
+        try:
+            subprocess.check_call(['git', 'mergetool'], cwd=outcome.repo)
+            subprocess.check_call(['git', 'commit', '--no-edit'], cwd=outcome.repo)
+            dry_run or subprocess.check_call(['git', 'push'], cwd=outcome.repo)
+        except Exception as exc:
+            print(exc, flush=True)
+            outcome.status, outcome.output = 'failed', str(exc)
+            return outcome
+    outcome.status = 'updated'
+    return outcome
+
+
+def safe_merge(name, **kwargs):
+    """
+    Merge unattended, capturing a failure as an outcome rather than
+    interrupting the other merges.
+    """
+    try:
+        return merge_unattended(name, **kwargs)
+    except Exception as exc:
+        output = f'{str(exc) or type(exc).__name__}\n'
+        return types.SimpleNamespace(name=name, status='failed', output=output)
+
+
+def report(outcome):
+    print(f'\nupdating {outcome.name} ({outcome.status})', flush=True)
+    print(outcome.output, end='', flush=True)
+
+
+def update_projects(projects, base, branch=None, dry_run=False, jobs=1):
+    """
+    Merge the base into each project, overlapping the unattended
+    merges, then resolve the deferred ones interactively and serially.
+
+    The checkouts of the deferred merges are cleaned up even if the
+    updates are interrupted.
+    """
+    update = functools.partial(safe_merge, base=base, branch=branch, dry_run=dry_run)
+    deferred = []
+    with contextlib.ExitStack() as stack:
+        with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+            for outcome in pool.map(update, projects):
+                report(outcome)
+                if outcome.status == 'deferred':
+                    stack.enter_context(outcome.cleanup)
+                    deferred.append(outcome)
+                else:
+                    yield outcome
+        for outcome in deferred:
+            yield merge_interactive(outcome, dry_run=dry_run)
 
 
 @main
@@ -64,10 +229,31 @@ def run(
     base: str = 'gh://jaraco/skeleton',
     branch: str | None = None,
     dry_run: bool = False,
+    jobs: Annotated[
+        int,
+        typer.Option(
+            '--jobs', '-j', min=1, help="Number of projects to merge concurrently."
+        ),
+    ] = 1,
+    force: Annotated[
+        bool, typer.Option(help="Update projects already recorded as merged.")
+    ] = False,
 ):
-    update = functools.partial(
-        update_project, base=base, branch=branch, dry_run=dry_run
-    )
-    updates = map(update, filter(tag, filter(keyword, git.projects())))
-    total = len(list(filter(None, updates)))
-    print(f"Updated {total} projects.")
+    projects = git.projects()
+    eligible = projects - projects.tagged('fork') - projects.tagged('base')
+    selected = sorted(filter(tag, filter(keyword, eligible)))
+    state = State(base, branch)
+    pending = selected if force else list(behind(selected, base, branch, state))
+    outcomes = []
+    for outcome in update_projects(pending, base, branch, dry_run, jobs):
+        outcomes.append(outcome)
+        if outcome.status == 'updated' and outcome.base and not dry_run:
+            state.record(outcome.name, outcome.base)
+    updated = [outcome for outcome in outcomes if outcome.status == 'updated']
+    failed = [outcome.name for outcome in outcomes if outcome.status == 'failed']
+    merge.report()
+    print(f"Skipped {len(selected) - len(pending)} projects already up to date.")
+    print(f"Updated {len(updated)} projects.")
+    if failed:
+        print(f"Failed to update {', '.join(sorted(failed))}.")
+        raise typer.Exit(1)